@@ -1,10 +1,13 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Request, Response, g, render_template, request, jsonify, send_file
 from flask_cors import CORS
 import os
 import io
 import re
+import numpy as np
 import pandas as pd
 import pdfplumber
+from pdfminer.pdfdocument import PDFEncryptionError, PDFPasswordIncorrect
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta
 import tempfile
@@ -12,11 +15,55 @@ import uuid
 import threading
 import time
 import base64
+import shutil
+import zipfile
+import mmap
+import zlib
+import heapq
+import hashlib
+import json
+import multiprocessing
+import sqlite3
+import bisect
+import cProfile
+import hmac
+import pstats
+from array import array
+from contextlib import ExitStack, closing, contextmanager
+from functools import lru_cache
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition
 from twilio.rest import Client
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# OCR of scanned statements is optional: it needs pytesseract and the tesseract binary
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+class UploadRequest(Request):
+    """Request that keeps small uploads in memory and spills large ones to UPLOAD_SPOOL_DIR"""
+    
+    @property
+    def max_content_length(self):
+        if self.path == '/upload/batch':
+            return BATCH_MAX_FILES * BATCH_MAX_FILE_BYTES
+        return UPLOAD_MAX_BYTES
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_MAX_BYTES:
+            return io.BytesIO()
+        # Named, so page-parallel extraction workers can open it by path
+        return tempfile.NamedTemporaryFile(dir=UPLOAD_SPOOL_DIR, prefix='upload-', suffix='.spool')
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)
 
 # Configuration
@@ -25,160 +72,1174 @@ DOWNLOAD_FOLDER = 'downloads'
 ALLOWED_EXTENSIONS = {'pdf'}
 FILE_CLEANUP_MINUTES = 15
 
+# Async upload processing (local process pool, no external queue service)
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', os.cpu_count() or 2))
+ASYNC_QUEUE_SIZE = int(os.environ.get('ASYNC_QUEUE_SIZE', 32))
+ASYNC_RETRY_AFTER_SECONDS = 5
+
+# Process pools (page extraction, async jobs, OCR) are replaced once they have
+# run this many tasks per worker, so memory a worker accumulates is returned
+# without restarting the web worker that holds the job state; 0 never replaces them
+POOL_MAX_TASKS_PER_WORKER = int(os.environ.get('POOL_MAX_TASKS_PER_WORKER', 100))
+
+# Scanned statements are OCR'd in their own smaller, lower-priority pool so they
+# can't hold up text uploads; OCR_WORKERS=0 turns OCR off
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 1))
+OCR_QUEUE_SIZE = int(os.environ.get('OCR_QUEUE_SIZE', 8))
+OCR_NICENESS = int(os.environ.get('OCR_NICENESS', 10))
+OCR_DPI = int(os.environ.get('OCR_DPI', 300))
+
+# Preflight samples this many pages to tell text PDFs from scanned ones: a page
+# with fewer characters than PREFLIGHT_MIN_CHARS has no usable text layer, and
+# only counts as a scan when images cover PREFLIGHT_MIN_IMAGE_COVERAGE of it
+PREFLIGHT_SAMPLE_PAGES = int(os.environ.get('PREFLIGHT_SAMPLE_PAGES', 3))
+PREFLIGHT_MIN_CHARS = int(os.environ.get('PREFLIGHT_MIN_CHARS', 50))
+PREFLIGHT_MIN_IMAGE_COVERAGE = float(os.environ.get('PREFLIGHT_MIN_IMAGE_COVERAGE', 0.5))
+
+# Results for re-uploaded statements are reused until their files are cleaned up.
+# Bump PARSER_VERSION whenever parsing output changes so stale results are not served.
+PARSER_VERSION = '6'
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+
+# Outbound notifications (WhatsApp via Twilio, email via SendGrid). Set
+# NOTIFICATION_TRANSPORT=file to write messages to NOTIFICATION_OUTBOX_FILE instead.
+NOTIFICATION_DB = os.environ.get('NOTIFICATION_DB', 'notifications.db')
+NOTIFICATION_TRANSPORT = os.environ.get('NOTIFICATION_TRANSPORT', 'live')
+NOTIFICATION_OUTBOX_FILE = os.environ.get('NOTIFICATION_OUTBOX_FILE', 'notifications.jsonl')
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', 2))
+NOTIFICATION_MAX_ATTEMPTS = 6
+NOTIFICATION_BACKOFF_SECONDS = 5
+NOTIFICATION_MAX_BACKOFF_SECONDS = 300
+NOTIFICATION_LEASE_SECONDS = 120
+NOTIFICATION_POLL_SECONDS = 2
+# Workbooks larger than this are emailed as a download link instead of an attachment
+EMAIL_ATTACHMENT_MAX_BYTES = int(os.environ.get('EMAIL_ATTACHMENT_MAX_BYTES', 5 * 1024 * 1024))
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', 'http://localhost:5000').rstrip('/')
+# (messages per second, burst) per provider
+NOTIFICATION_RATE_LIMITS = {'whatsapp': (1, 5), 'email': (10, 20)}
+
+# Uploads larger than this are rejected while the request body is still streaming in.
+# Smaller statements are parsed straight from memory; anything over
+# UPLOAD_SPOOL_MAX_BYTES is spilled to a temp file in UPLOAD_SPOOL_DIR (tmpfs
+# where available) and memory-mapped for parsing. In-memory statements with
+# PARALLEL_PAGE_THRESHOLD or more pages are also written there before parsing,
+# since the page pool opens statements by path.
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 50 * 1024 * 1024))
+UPLOAD_SPOOL_MAX_BYTES = int(os.environ.get('UPLOAD_SPOOL_MAX_BYTES', 8 * 1024 * 1024))
+UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+# Multi-statement batch uploads
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', 24))
+BATCH_MAX_FILE_BYTES = 50 * 1024 * 1024
+
+# Downloadable export file names, by download type
+EXPORT_SUFFIXES = {'csv': '_statement.csv', 'excel': '_statement.xlsx'}
+
+# Rows per chunk when streaming CSV downloads
+CSV_STREAM_CHUNK_ROWS = 5000
+
+# Statements with at least this many rows are exported with a write-only workbook
+XLSX_STREAMING_THRESHOLD = int(os.environ.get('XLSX_STREAMING_THRESHOLD', 1000))
+XLSX_HEADER_FONT = Font(bold=True)
+XLSX_HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                            top=Side(style='thin'), bottom=Side(style='thin'))
+XLSX_HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+# 'auto' reads statements with a recognisable table header column by column from
+# word positions, falling back to text lines otherwise; 'text' always uses lines
+EXTRACTION_MODE = os.environ.get('EXTRACTION_MODE', 'auto')
+
+# Page-parallel PDF text extraction
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', os.cpu_count() or 1))
+PARALLEL_PAGE_THRESHOLD = int(os.environ.get('PARALLEL_PAGE_THRESHOLD', 20))
+
+# Latency histogram buckets (seconds) for the /metrics endpoint
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Admins can profile a single request by sending "X-Profile: 1" with their
+# token in X-Admin-Token; the cProfile report is added to JSON responses
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+PROFILE_TOP_FUNCTIONS = 40
+
 # Create directories if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 
-# Store file metadata for cleanup
-file_registry = {}
+# Pending file cleanups are persisted here so they survive restarts
+FILE_REGISTRY_DB = os.environ.get('FILE_REGISTRY_DB', 'file_registry.db')
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-class BankStatementParser:
+# Bank-specific patterns for Indian banks
+BANK_PATTERNS = {
+    'SBI': {
+        'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
+        'amount_pattern': r'(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)',
+        'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
+    },
+    'ICICI': {
+        'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
+        'amount_pattern': r'(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)',
+        'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
+    },
+    'HDFC': {
+        'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
+        'amount_pattern': r'(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)',
+        'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
+    },
+    'KOTAK': {
+        'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
+        'amount_pattern': r'(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)',
+        'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
+    },
+    'AXIS': {
+        'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
+        'amount_pattern': r'(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)',
+        'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
+    }
+}
+
+# Generic line grammar used when the bank is unknown or its grammar does not match
+GENERIC_DATE_PATTERN = r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})'
+GENERIC_AMOUNT_PATTERN = r'(\d[\d,]*(?:\.\d+)?)'
+
+def compile_line_grammar(date_pattern, amount_pattern):
+    """Build one regex that splits a statement line into date, description and trailing amounts"""
+    # Amount columns may carry a sign or a Cr/Dr marker, e.g. "-1,331.33" or "1,331.33 Dr"
+    amount_column = r'-?' + amount_pattern + r'(?:\s?(?:Cr|Dr|CR|DR)\.?)?'
+    return re.compile(
+        r'(?<![\d/-])(?P<date>' + date_pattern + r')\s+'
+        r'(?P<description>\S.*?)\s+'
+        r'(?P<amounts>' + amount_column + r'(?:\s+' + amount_column + r')*)\s*$'
+    )
+
+# Compiled once at import so no pattern is rebuilt or looked up per line
+GENERIC_LINE_GRAMMAR = compile_line_grammar(GENERIC_DATE_PATTERN, GENERIC_AMOUNT_PATTERN)
+LINE_GRAMMARS = {
+    bank: compile_line_grammar(patterns['date_pattern'], patterns['amount_pattern'])
+    for bank, patterns in BANK_PATTERNS.items()
+}
+
+# Bank names looked for in a statement's first page, then its PDF metadata, in priority order
+BANK_SIGNATURES = [
+    ('SBI', re.compile(r'STATE BANK OF INDIA|SBI', re.IGNORECASE)),
+    ('ICICI', re.compile(r'ICICI', re.IGNORECASE)),
+    ('HDFC', re.compile(r'HDFC', re.IGNORECASE)),
+    ('KOTAK', re.compile(r'KOTAK', re.IGNORECASE)),
+    ('AXIS', re.compile(r'AXIS', re.IGNORECASE)),
+]
+
+def detect_bank(text, metadata=None):
+    """Identify the bank from first-page text, falling back to the PDF's metadata (title,
+    author, producer...) for pages without a text layer; 'GENERIC' if neither names one
+    """
+    sources = [text]
+    if metadata:
+        sources.append(' '.join(str(value) for value in metadata.values()))
+    for source in sources:
+        for bank, signature in BANK_SIGNATURES:
+            if signature.search(source):
+                return bank
+    return 'GENERIC'
+
+def read_first_page(pdf_path):
+    """(metadata, words) of a statement's first page, enough to pick its parser and table layout"""
+    with open_pdf(pdf_path) as pdf:
+        if not pdf.pages:
+            return pdf.metadata, []
+        page = pdf.pages[0]
+        words = page.extract_words()
+        page.close()
+        return pdf.metadata, words
+
+def words_text(words):
+    return ' '.join(word['text'] for word in words)
+
+# Date and amount patterns tried by extract_transaction_from_line, in priority order
+LINE_DATE_PATTERNS = [re.compile(pattern) for pattern in [
+    r'(\d{2}/\d{2}/\d{4})',
+    r'(\d{2}-\d{2}-\d{4})',
+    r'(\d{2}\.\d{2}\.\d{4})',
+    r'(\d{4}-\d{2}-\d{2})'
+]]
+LINE_AMOUNT_PATTERNS = [re.compile(pattern) for pattern in [
+    r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    r'(\d+\.?\d*)'
+]]
+LINE_PART_SEPARATOR = re.compile(r'\s{2,}')
+# One amount column of a line: the figure with its minus sign and Cr/Dr marker, if any
+AMOUNT_TOKEN = re.compile(r'(-?)(\d[\d,]*(?:\.\d+)?)(?:\s?(Cr|Dr|CR|DR)\.?)?')
+
+# Statement date formats, tried in order. A statement uses one format throughout,
+# so it is picked from the first few dates and tried first for the rest.
+DATE_FORMATS = ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y']
+DATE_FORMAT_SAMPLE_SIZE = 5
+DATE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_with_format(date_str, fmt):
+    """strptime for a single format, memoized; None if the string does not match"""
+    try:
+        return datetime.strptime(date_str, fmt)
+    except ValueError:
+        return None
+
+# Expense categorization patterns
+DEFAULT_CATEGORIES = {
+    'Groceries': ['grocery', 'supermarket', 'bigbasket', 'grofers', 'amazon fresh', 'flipkart grocery'],
+    'Utilities': ['electricity', 'water', 'gas', 'internet', 'broadband', 'wifi', 'mobile', 'airtel', 'jio', 'vodafone'],
+    'Food & Dining': ['swiggy', 'zomato', 'restaurant', 'food', 'pizza', 'burger', 'cafe', 'coffee'],
+    'Transportation': ['uber', 'ola', 'metro', 'bus', 'petrol', 'diesel', 'fuel', 'taxi'],
+    'Entertainment': ['movie', 'cinema', 'netflix', 'amazon prime', 'hotstar', 'spotify', 'gaming'],
+    'Shopping': ['amazon', 'flipkart', 'myntra', 'ajio', 'shopping', 'mall', 'purchase'],
+    'Healthcare': ['hospital', 'medical', 'pharmacy', 'doctor', 'medicine', 'clinic'],
+    'Banking': ['atm', 'withdrawal', 'transfer', 'deposit', 'interest', 'charges', 'fee'],
+    'Education': ['school', 'college', 'university', 'course', 'training', 'education'],
+    'Other': []
+}
+
+class KeywordMatcher:
+    """Match many keyword groups against a lowercased string in a single regex pass"""
+    
+    def __init__(self, groups):
+        # groups maps name -> keywords; earlier groups win when several match
+        self.groups = {name: list(keywords) for name, keywords in groups.items()}
+        self.names = list(self.groups)
+        self.priority = {}
+        for index, keywords in enumerate(self.groups.values()):
+            for keyword in keywords:
+                self.priority.setdefault(keyword.lower(), index)
+        
+        # Alternatives are ordered by priority so that, at any start position, the
+        # highest-priority keyword is the one reported; the lookahead lets matches overlap
+        ordered = sorted(self.priority, key=lambda keyword: (self.priority[keyword], -len(keyword)))
+        alternation = '|'.join(re.escape(keyword) for keyword in ordered)
+        self.pattern = re.compile(f'(?=({alternation}))') if ordered else None
+        self.any_pattern = re.compile(alternation) if ordered else None
+        
+        # One alternation per group, used by the vectorized pandas path
+        self.group_patterns = {
+            name: '|'.join(re.escape(keyword.lower()) for keyword in keywords)
+            for name, keywords in self.groups.items() if keywords
+        }
+    
+    def match(self, text):
+        """Return the highest-priority group with a keyword in text, or None"""
+        if self.pattern is None:
+            return None
+        best = None
+        for found in self.pattern.finditer(text):
+            index = self.priority[found.group(1)]
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return self.names[best] if best is not None else None
+    
+    def contains_any(self, text):
+        return self.any_pattern is not None and self.any_pattern.search(text) is not None
+    
+    def match_series(self, texts, default):
+        """Vectorized match over a Series of lowercased strings"""
+        result = np.full(len(texts), default, dtype=object)
+        remaining = np.ones(len(texts), dtype=bool)
+        # Groups are tested in priority order, each only against rows no earlier group
+        # claimed, so the first matching group wins as in match()
+        for name in self.names:
+            if name not in self.group_patterns:
+                continue
+            rows = np.flatnonzero(remaining)
+            if len(rows) == 0:
+                break
+            hits = texts.iloc[rows].str.contains(self.group_patterns[name], regex=True).to_numpy(dtype=bool)
+            result[rows[hits]] = name
+            remaining[rows[hits]] = False
+        return result
+
+DEBIT_KEYWORD_MATCHER = KeywordMatcher({'debit': ['withdrawal', 'purchase', 'payment', 'debit', 'transfer out']})
+
+# Optional JSON file ({"Category": ["keyword", ...], ...}) that replaces the default
+# categories; it is re-read whenever its modification time changes
+CATEGORIES_FILE = os.environ.get('CATEGORIES_FILE')
+
+category_matcher = None
+category_matcher_mtime = None
+# Bumped whenever the category table is replaced, so cached results from the old one aren't served
+category_version = 0
+category_matcher_lock = threading.Lock()
+
+def build_category_matcher(categories):
+    # 'Other' is the fallback and never matched by keyword
+    return KeywordMatcher({name: keywords for name, keywords in categories.items() if name != 'Other'})
+
+def reload_categories(categories):
+    """Swap in a new category keyword table at runtime"""
+    global category_matcher, category_version
+    matcher = build_category_matcher(categories)
+    with category_matcher_lock:
+        category_matcher = matcher
+        category_version += 1
+    return matcher
+
+def get_category_matcher():
+    """Return the current category matcher, reloading CATEGORIES_FILE if it changed"""
+    global category_matcher, category_matcher_mtime, category_version
+    with category_matcher_lock:
+        if CATEGORIES_FILE:
+            try:
+                mtime = os.path.getmtime(CATEGORIES_FILE)
+                if mtime != category_matcher_mtime:
+                    with open(CATEGORIES_FILE, encoding='utf-8') as f:
+                        category_matcher = build_category_matcher(json.load(f))
+                    category_matcher_mtime = mtime
+                    category_version += 1
+            except (OSError, ValueError) as e:
+                print(f"Error loading categories from {CATEGORIES_FILE}: {e}")
+        if category_matcher is None:
+            category_matcher = build_category_matcher(DEFAULT_CATEGORIES)
+        return category_matcher
+
+def current_category_version():
+    """category_version after picking up any change to CATEGORIES_FILE"""
+    get_category_matcher()
+    return category_version
+
+# Pool workers start from a forkserver, not as forks of the threaded server
+# process: a fork copies any lock another request thread holds at that moment.
+# The forkserver imports the app once, so each new worker starts from it quickly.
+pool_context = multiprocessing.get_context('forkserver')
+pool_context.set_forkserver_preload(['app'])
+
+def pool_needs_recycling(tasks, max_workers):
+    """Whether a pool that has been given tasks tasks should be replaced by a fresh one
+    
+    Replaced pools are shut down without waiting, so work already given to them
+    still finishes. (ProcessPoolExecutor's own max_tasks_per_child can deadlock
+    on Python 3.11.)
+    """
+    return POOL_MAX_TASKS_PER_WORKER > 0 and tasks >= POOL_MAX_TASKS_PER_WORKER * max_workers
+
+# Shared pools for page-range extraction, keyed by worker count and created on first use
+page_pools = {}
+page_pool_tasks = {}
+page_pools_lock = threading.Lock()
+page_pools_pid = None
+
+def submit_page_task(max_workers, fn, *args):
+    """Run fn in the shared page pool with max_workers workers, replacing the pool when it is due"""
+    global page_pools_pid
+    with page_pools_lock:
+        # A forked child (e.g. a recycled server worker) can't use its parent's pools
+        if page_pools_pid != os.getpid():
+            page_pools.clear()
+            page_pool_tasks.clear()
+            page_pools_pid = os.getpid()
+        pool = page_pools.get(max_workers)
+        if pool is not None and pool_needs_recycling(page_pool_tasks[max_workers], max_workers):
+            pool.shutdown(wait=False)
+            pool = None
+        if pool is None:
+            pool = page_pools[max_workers] = ProcessPoolExecutor(max_workers=max_workers, mp_context=pool_context)
+            page_pool_tasks[max_workers] = 0
+        page_pool_tasks[max_workers] += 1
+        return pool.submit(fn, *args)
+
+@contextmanager
+def open_pdf(source):
+    """Open a PDF from a path, memory-mapped, or from a binary file object"""
+    if isinstance(source, str):
+        with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with pdfplumber.open(mapped) as pdf:
+                # Page rendering (to_image, for OCR) can't read the map, only a path
+                pdf.path = source
+                yield pdf
+    else:
+        source.seek(0)
+        with pdfplumber.open(source) as pdf:
+            yield pdf
+
+def extract_page_text(page):
+    return page.extract_text() or ""
+
+def extract_page_rows(page, layout):
+    return layout.rows(page.extract_words())
+
+def extract_page_ocr_text(page):
+    """Text of a scanned page, read by Tesseract from a rendering of the page"""
+    image = page.to_image(resolution=OCR_DPI).original
+    # psm 6 reads the page as one block, keeping each statement row on its own line
+    return pytesseract.image_to_string(image, config='--psm 6')
+
+@lru_cache(maxsize=None)
+def ocr_available():
+    """Whether scans can be read: Tesseract is installed and pages can be rendered for it"""
+    if pytesseract is None or OCR_WORKERS <= 0:
+        return False
+    # pdfplumber renders one page at a time with pypdfium2 (0.10 onwards); older
+    # versions go through ImageMagick and re-read the whole document per page
+    try:
+        import pypdfium2  # noqa: F401
+    except ImportError:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+    except pytesseract.TesseractNotFoundError:
+        return False
+    return True
+
+def init_ocr_worker():
+    # Yield the CPU to text parsing, and keep Tesseract to one thread per worker
+    os.nice(OCR_NICENESS)
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+def image_coverage(page):
+    """Share of the page's area covered by images, counting overlaps twice"""
+    page_area = float(page.width * page.height) or 1.0
+    covered = 0.0
+    for image in page.images:
+        width = min(image['x1'], page.width) - max(image['x0'], 0)
+        height = min(image['bottom'], page.height) - max(image['top'], 0)
+        if width > 0 and height > 0:
+            covered += width * height
+    return min(covered / page_area, 1.0)
+
+def preflight_pdf(source):
+    """Classify a PDF as 'text', 'scanned', 'empty', 'encrypted' or 'unreadable' from a few sampled pages
+    
+    Looks at the first, last and evenly spaced pages in between: if any has a text
+    layer the statement is parsed as text, otherwise it is a scan if a page is
+    mostly image and empty if not (as is a PDF without pages). Files pdfplumber
+    can't open are encrypted or unreadable. Returns a dict with the kind, page
+    count and what was sampled. File objects are left rewound.
+    """
+    try:
+        with open_pdf(source) as pdf:
+            page_count = len(pdf.pages)
+            sample_count = min(PREFLIGHT_SAMPLE_PAGES, page_count)
+            if sample_count > 1:
+                sampled = sorted({round(i * (page_count - 1) / (sample_count - 1)) for i in range(sample_count)})
+            else:
+                sampled = list(range(sample_count))
+            chars, coverage = [], []
+            for i in sampled:
+                page = pdf.pages[i]
+                chars.append(len(page.chars))
+                coverage.append(image_coverage(page))
+                page.close()
+    except Exception as e:
+        # pdfplumber wraps pdfminer's errors; the original is the first argument
+        cause = e.args[0] if e.args and isinstance(e.args[0], Exception) else e
+        if isinstance(cause, (PDFPasswordIncorrect, PDFEncryptionError)):
+            return {'kind': 'encrypted', 'pages': None, 'sampled_pages': 0}
+        return {'kind': 'unreadable', 'pages': None, 'sampled_pages': 0}
+    finally:
+        if not isinstance(source, str):
+            source.seek(0)
+    
+    if any(count >= PREFLIGHT_MIN_CHARS for count in chars):
+        kind = 'text'
+    elif sampled and max(coverage) >= PREFLIGHT_MIN_IMAGE_COVERAGE:
+        kind = 'scanned'
+    else:
+        kind = 'empty'
+    return {
+        'kind': kind,
+        'pages': page_count,
+        'sampled_pages': len(sampled),
+        'chars_per_page': round(sum(chars) / len(sampled)) if sampled else 0,
+        'image_coverage': round(max(coverage), 2) if coverage else 0.0
+    }
+
+def extract_page_range(pdf_path, start, stop, extract, *args):
+    """Run extract(page, *args) on pages [start, stop), returning (result, seconds) per page
+    
+    Runs in a pool worker that opens the file itself.
+    """
+    pages = []
+    with open_pdf(pdf_path) as pdf:
+        for i in range(start, stop):
+            started = time.perf_counter()
+            page = pdf.pages[i]
+            result = extract(page, *args)
+            page.close()
+            pages.append((result, time.perf_counter() - started))
+    return pages
+
+class PipelineMetrics:
+    """Upload pipeline counters and per-stage latency histograms, in Prometheus text format
+    
+    Pool worker processes record into their own copy; run_with_metrics drains it
+    after each job and the parent merges the snapshot back in.
+    """
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = Counter()
+    
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            histogram['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+    
+    @contextmanager
+    def timed(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+    
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+    
+    def drain(self):
+        """Return everything recorded so far and start over"""
+        with self.lock:
+            snapshot = {'histograms': self.histograms, 'counters': dict(self.counters)}
+            self.histograms = {}
+            self.counters = Counter()
+            return snapshot
+    
+    def merge(self, snapshot):
+        with self.lock:
+            for stage, other in snapshot['histograms'].items():
+                histogram = self.histograms.setdefault(
+                    stage, {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0})
+                histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], other['buckets'])]
+                histogram['sum'] += other['sum']
+                histogram['count'] += other['count']
+            self.counters.update(snapshot['counters'])
+    
+    def render(self, gauges=None):
+        """Render everything recorded, plus gauges ({name: value}) read at scrape time"""
+        lines = ['# HELP billkaro_stage_seconds Time spent in each upload pipeline stage',
+                 '# TYPE billkaro_stage_seconds histogram']
+        with self.lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(list(self.buckets) + ['+Inf'], histogram['buckets']):
+                    cumulative += count
+                    lines.append(f'billkaro_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'billkaro_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+                lines.append(f'billkaro_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE billkaro_{name}_total counter')
+                lines.append(f'billkaro_{name}_total {value}')
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE billkaro_{name} gauge')
+            lines.append(f'billkaro_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+pipeline_metrics = PipelineMetrics(METRICS_BUCKETS)
+
+def run_with_metrics(fn, *args):
+    """Run fn in a pool worker, returning its result with the metrics it recorded"""
+    result = fn(*args)
+    return result, pipeline_metrics.drain()
+
+def timed_chunks(stage, chunks):
+    """Pass a stream of chunks through, timing only the work of producing them"""
+    elapsed = 0.0
+    chunks = iter(chunks)
+    while True:
+        started = time.perf_counter()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            break
+        finally:
+            elapsed += time.perf_counter() - started
+        yield chunk
+    pipeline_metrics.observe(stage, elapsed)
+
+# Table header cells, classified by keyword in priority order ("Withdrawal Amt."
+# is a debit column, "Closing Balance" the balance column)
+TABLE_HEADER_KEYWORDS = [
+    ('Balance', ('balance',)),
+    ('Debit', ('debit', 'withdrawal')),
+    ('Credit', ('credit', 'deposit')),
+    ('Amount', ('amount', 'amt')),
+    ('Date', ('date',)),
+    ('Description', ('description', 'narration', 'particulars', 'remarks', 'details')),
+]
+TABLE_AMOUNT_COLUMNS = {'Debit', 'Credit', 'Amount', 'Balance'}
+TABLE_DATE_CELL = re.compile(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}')
+TABLE_AMOUNT_CELL = re.compile(r'(?P<sign>-)?(?P<value>\d[\d,]*(?:\.\d+)?)\s*(?P<marker>Cr|Dr|CR|DR)?\.?')
+TABLE_AMOUNT_MARKERS = {'cr', 'dr', 'cr.', 'dr.'}
+
+class TableLayout:
+    """Column x-boundaries of a statement table, detected once from its header row
+    
+    Body words are bucketed into columns by position: amounts by their right edge,
+    since they are right-aligned, and text by its left edge. A row with a date
+    starts a transaction; a row with only description text continues the previous
+    one's narration.
+    """
+    
+    def __init__(self, columns):
+        # columns: [(name, x0, x1)] left to right; name is None for columns we don't read
+        self.names = [name for name, _, _ in columns]
+        self.boundaries = [(left[2] + right[1]) / 2 for left, right in zip(columns, columns[1:])]
+        self.header = None
+    
+    @classmethod
+    def detect(cls, words):
+        """Find the header row among a page's words; returns a TableLayout or None"""
+        for row in group_word_rows(words):
+            cells = merge_header_cells(row)
+            columns = []
+            for text, x0, x1 in cells:
+                name = classify_header_cell(text)
+                if name is not None and any(name == existing for existing, _, _ in columns):
+                    # e.g. "Value Date" after "Txn Date": only the first is read
+                    name = None
+                columns.append((name, x0, x1))
+            found = {name for name, _, _ in columns}
+            if {'Date', 'Description', 'Balance'} <= found and ({'Debit', 'Credit'} <= found or 'Amount' in found):
+                layout = cls(columns)
+                layout.header = ' '.join(text for text, _, _ in cells)
+                return layout
+        return None
+    
+    def column(self, word):
+        text = word['text']
+        is_amount = TABLE_AMOUNT_CELL.fullmatch(text) is not None or text.lower() in TABLE_AMOUNT_MARKERS
+        name = self.names[bisect.bisect_right(self.boundaries, word['x1'] if is_amount else word['x0'])]
+        if name in TABLE_AMOUNT_COLUMNS and not is_amount:
+            # Long narrations run on under the amount columns
+            return 'Description'
+        return name
+    
+    def rows(self, words):
+        """(date string, description, debit, credit, balance) for each transaction row on a page"""
+        transactions = []
+        for row in group_word_rows(words):
+            cells = {}
+            for word in row:
+                name = self.column(word)
+                if name is not None:
+                    cells.setdefault(name, []).append(word['text'])
+            cells = {name: ' '.join(texts) for name, texts in cells.items()}
+            
+            date_str = cells.get('Date', '')
+            if not TABLE_DATE_CELL.fullmatch(date_str):
+                if transactions and set(cells) == {'Description'}:
+                    transactions[-1][1] += ' ' + cells['Description']
+                continue
+            
+            description = cells.get('Description', '').strip()
+            balance = parse_amount_cell(cells.get('Balance', ''), signed=True)
+            if 'Amount' in cells:
+                amount = parse_amount_cell(cells['Amount'], signed=True)
+                marker = cells['Amount'].lower()
+                if amount < 0 or 'dr' in marker:
+                    is_debit = True
+                elif 'cr' in marker:
+                    is_debit = False
+                else:
+                    is_debit = DEBIT_KEYWORD_MATCHER.contains_any(description.lower())
+                debit, credit = (abs(amount), 0) if is_debit else (0, abs(amount))
+            else:
+                debit = parse_amount_cell(cells.get('Debit', ''))
+                credit = parse_amount_cell(cells.get('Credit', ''))
+            if debit == 0 and credit == 0:
+                continue
+            transactions.append([date_str, description, debit, credit, balance])
+        return [tuple(transaction) for transaction in transactions]
+
+def group_word_rows(words, tolerance=2):
+    """Group pdfplumber words into rows of words sorted left to right"""
+    rows = []
+    for word in sorted(words, key=lambda word: (round(word['top']), word['x0'])):
+        if rows and abs(word['top'] - rows[-1][0]['top']) <= tolerance:
+            rows[-1].append(word)
+        else:
+            rows.append([word])
+    return [sorted(row, key=lambda word: word['x0']) for row in rows]
+
+def merge_header_cells(row):
+    """Join header words closer than about a space apart into (text, x0, x1) cells"""
+    cells = []
+    for word in row:
+        gap_limit = (word['bottom'] - word['top']) * 0.6
+        if cells and word['x0'] - cells[-1][2] <= gap_limit:
+            text, x0, _ = cells[-1]
+            cells[-1] = (f"{text} {word['text']}", x0, word['x1'])
+        else:
+            cells.append((word['text'], word['x0'], word['x1']))
+    return cells
+
+def classify_header_cell(text):
+    lowered = text.lower()
+    for name, keywords in TABLE_HEADER_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            return name
+    return None
+
+def parse_amount_cell(text, signed=False):
+    """Rupee amount in a table cell; Dr or a minus sign make it negative when signed"""
+    match = TABLE_AMOUNT_CELL.search(text)
+    if match is None:
+        return 0
+    amount = float(match.group('value').replace(',', ''))
+    if signed and (match.group('sign') or (match.group('marker') or '').lower() == 'dr'):
+        amount = -amount
+    return amount
+
+# datetime64 "not a time" sentinel, stored for dates that could not be parsed
+NAT_SECONDS = np.iinfo(np.int64).min
+EPOCH = datetime(1970, 1, 1)
+
+def to_paise(amount):
+    """Rupee amount as an exact integer number of paise"""
+    return int(round(amount * 100))
+
+class TransactionBuffer:
+    """Columnar store of parsed transactions held in typed arrays
+    
+    Amounts are int64 paise so totals carry no float error, dates are epoch
+    seconds read as datetime64, categories are two-byte and banks one-byte codes.
+    Rows are only appended; to_frame() wraps the arrays without copying them,
+    so it is taken once the buffer is complete.
+    """
+    
+    COLUMNS = ['Date', 'Description', 'Debit', 'Credit', 'Balance', 'Category']
+    
     def __init__(self):
-        # Bank-specific patterns for Indian banks
-        self.bank_patterns = {
-            'SBI': {
-                'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
-                'amount_pattern': r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
-            },
-            'ICICI': {
-                'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
-                'amount_pattern': r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
-            },
-            'HDFC': {
-                'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
-                'amount_pattern': r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
-            },
-            'KOTAK': {
-                'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
-                'amount_pattern': r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
-            },
-            'AXIS': {
-                'date_pattern': r'(\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4})',
-                'amount_pattern': r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                'transaction_pattern': r'(\d{2}/\d{2}/\d{4})\s+(.*?)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)\s+([\d,]+\.?\d*)'
-            }
+        self.dates = array('q')
+        self.descriptions = []
+        self.debits = array('q')
+        self.credits = array('q')
+        self.balances = array('q')
+        # Two bytes, so category files may define more than 127 categories
+        self.category_codes = array('h')
+        self.bank_codes = array('b')
+        self.category_names = []
+        self.bank_names = []
+        self._category_lookup = {}
+        self._bank_lookup = {}
+    
+    def __len__(self):
+        return len(self.debits)
+    
+    def _code(self, value, names, lookup):
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(names)
+            names.append(value)
+        return code
+    
+    def append(self, date, description, debit, credit, balance, category, bank=None):
+        """Add one row; date is a datetime or None, amounts are integer paise"""
+        self.dates.append(NAT_SECONDS if date is None else (date - EPOCH).days * 86400)
+        self.descriptions.append(description)
+        self.debits.append(debit)
+        self.credits.append(credit)
+        self.balances.append(balance)
+        self.category_codes.append(self._code(category, self.category_names, self._category_lookup))
+        self.bank_codes.append(self._code(bank or 'GENERIC', self.bank_names, self._bank_lookup))
+    
+    @classmethod
+    def from_records(cls, transactions, bank=None):
+        """Build a buffer from transaction dicts with ISO date strings and rupee amounts"""
+        buffer = cls()
+        for transaction in transactions:
+            try:
+                date = datetime.strptime(transaction['Date'], '%Y-%m-%d')
+            except (TypeError, ValueError):
+                date = None
+            buffer.append(date, transaction['Description'], to_paise(transaction['Debit']),
+                          to_paise(transaction['Credit']), to_paise(transaction['Balance']),
+                          transaction.get('Category', 'Other'), bank)
+        return buffer
+    
+    def set_dates(self, start, dates):
+        """Overwrite the dates of rows start onward with a datetime64 array"""
+        self.dates[start:] = array('q', dates.astype('datetime64[s]').view(np.int64).tobytes())
+    
+    def arrays(self):
+        """Zero-copy numpy views of the typed columns"""
+        return {
+            'Date': np.frombuffer(self.dates, dtype=np.int64).view('datetime64[s]'),
+            'Debit': np.frombuffer(self.debits, dtype=np.int64),
+            'Credit': np.frombuffer(self.credits, dtype=np.int64),
+            'Balance': np.frombuffer(self.balances, dtype=np.int64),
+            'Category': np.frombuffer(self.category_codes, dtype=np.int16),
+            'Bank': np.frombuffer(self.bank_codes, dtype=np.int8)
         }
-        
-        # Expense categorization patterns
-        self.categories = {
-            'Groceries': ['grocery', 'supermarket', 'bigbasket', 'grofers', 'amazon fresh', 'flipkart grocery'],
-            'Utilities': ['electricity', 'water', 'gas', 'internet', 'broadband', 'wifi', 'mobile', 'airtel', 'jio', 'vodafone'],
-            'Food & Dining': ['swiggy', 'zomato', 'restaurant', 'food', 'pizza', 'burger', 'cafe', 'coffee'],
-            'Transportation': ['uber', 'ola', 'metro', 'bus', 'petrol', 'diesel', 'fuel', 'taxi'],
-            'Entertainment': ['movie', 'cinema', 'netflix', 'amazon prime', 'hotstar', 'spotify', 'gaming'],
-            'Shopping': ['amazon', 'flipkart', 'myntra', 'ajio', 'shopping', 'mall', 'purchase'],
-            'Healthcare': ['hospital', 'medical', 'pharmacy', 'doctor', 'medicine', 'clinic'],
-            'Banking': ['atm', 'withdrawal', 'transfer', 'deposit', 'interest', 'charges', 'fee'],
-            'Education': ['school', 'college', 'university', 'course', 'training', 'education'],
-            'Other': []
+    
+    def to_frame(self, with_bank=False):
+        """Transactions DataFrame over the buffer's arrays; amounts are shown in rupees"""
+        columns = self.arrays()
+        data = {
+            'Date': columns['Date'],
+            'Description': self.descriptions,
+            'Debit': columns['Debit'] / 100,
+            'Credit': columns['Credit'] / 100,
+            'Balance': columns['Balance'] / 100,
+            'Category': pd.Categorical.from_codes(columns['Category'], self.category_names, validate=False)
         }
+        if with_bank:
+            data['Bank'] = pd.Categorical.from_codes(columns['Bank'], self.bank_names, validate=False)
+        return pd.DataFrame(data, copy=False)
+
+# Largest gap, in paise, between a row's balance change and its Credit - Debit that
+# still counts as consistent
+BALANCE_TOLERANCE_PAISE = 1
+
+def check_balances(buffer, start=0):
+    """Check rows start onward against the running balance, fixing swapped debit/credit in place
+    
+    Each row's balance change should equal its Credit - Debit. A row whose change is
+    exactly the opposite has its amount in the wrong column and is flipped; rows that
+    match neither are flagged. Statements listed newest first are checked in reverse.
+    Rows without a balance, or after one, can't be checked.
+    
+    Returns the number of rows checked, corrected and flagged, and the confidence:
+    the share of checked rows consistent after correction, or None if none could be.
+    """
+    columns = buffer.arrays()
+    debits = columns['Debit'][start:]
+    credits = columns['Credit'][start:]
+    balances = columns['Balance'][start:]
+    net = credits - debits
+    movement = np.diff(balances)
+    has_balance = balances != 0
+    checkable = has_balance[1:] & has_balance[:-1]
+    
+    # Oldest first, row i moved the balance from row i-1's; newest first, to row i+1's
+    forward = np.abs(movement - net[1:]) <= BALANCE_TOLERANCE_PAISE
+    backward = np.abs(movement + net[:-1]) <= BALANCE_TOLERANCE_PAISE
+    if np.count_nonzero(backward & checkable) > np.count_nonzero(forward & checkable):
+        movement, row_net, offset = -movement, net[:-1], 0
+    else:
+        row_net, offset = net[1:], 1
+    
+    consistent = checkable & (np.abs(movement - row_net) <= BALANCE_TOLERANCE_PAISE)
+    swapped = (checkable & ~consistent & (row_net != 0)
+               & (np.abs(movement + row_net) <= BALANCE_TOLERANCE_PAISE))
+    rows = np.flatnonzero(swapped) + offset
+    debits[rows], credits[rows] = credits[rows], debits[rows].copy()
+    
+    checked = int(np.count_nonzero(checkable))
+    corrected = len(rows)
+    flagged = checked - int(np.count_nonzero(consistent)) - corrected
+    return {
+        'checked': checked,
+        'corrected': corrected,
+        'flagged': flagged,
+        'confidence': round((checked - flagged) / checked, 4) if checked else None
+    }
+
+class BankStatementParser:
+    """Statement parser for any bank; per-bank subclasses are registered in STATEMENT_PARSERS
+    
+    This class detects the bank itself from each statement's first page. Subclasses
+    know their bank up front and set its patterns and line grammar.
+    """
+    bank = None
+    patterns = None
+    line_grammar = None
+    
+    def __init__(self, parse_workers=None, parallel_page_threshold=None, ocr=False):
+        # Scanned statements are read by OCR, one page at a time in this process
+        self.ocr = ocr
+        self.parse_workers = 1 if ocr else parse_workers if parse_workers is not None else PARSE_WORKERS
+        self.parallel_page_threshold = (parallel_page_threshold if parallel_page_threshold is not None
+                                        else PARALLEL_PAGE_THRESHOLD)
+        # Bank, table layout, date format and work counters of the statement being parsed
+        self.start_statement()
+        # (source, metadata, words) already read by statement_parser_for
+        self.first_page = None
+        
+        # Bank-specific patterns for Indian banks
+        self.bank_patterns = BANK_PATTERNS
+        
+        # Expense categorization patterns, compiled into a single keyword matcher
+        self.category_matcher = get_category_matcher()
+        self.categories = dict(self.category_matcher.groups, Other=[])
+
+    def classify_batch(self, descriptions):
+        """Vectorized categorization and debit/credit direction for a Series of descriptions"""
+        lowered = pd.Series(descriptions).fillna('').astype(str).str.lower()
+        is_debit = lowered.str.contains(DEBIT_KEYWORD_MATCHER.group_patterns['debit'], regex=True)
+        return pd.DataFrame({
+            'Category': self.category_matcher.match_series(lowered, 'Other'),
+            'Direction': np.where(is_debit.to_numpy(dtype=bool), 'Debit', 'Credit')
+        }, index=lowered.index)
 
     def detect_bank_type(self, text):
         """Detect which bank the statement belongs to"""
-        text_upper = text.upper()
-        
-        if 'STATE BANK OF INDIA' in text_upper or 'SBI' in text_upper:
-            return 'SBI'
-        elif 'ICICI' in text_upper:
-            return 'ICICI'
-        elif 'HDFC' in text_upper:
-            return 'HDFC'
-        elif 'KOTAK' in text_upper:
-            return 'KOTAK'
-        elif 'AXIS' in text_upper:
-            return 'AXIS'
-        else:
-            return 'GENERIC'
+        return detect_bank(text)
 
     def categorize_transaction(self, description):
         """Categorize transaction based on description"""
-        description_lower = description.lower()
+        return self.category_matcher.match(description.lower()) or 'Other'
+
+    def iter_page_texts(self, pdf_path):
+        """Yield page text in order"""
+        return self.iter_pages(pdf_path, extract_page_text)
+
+    def iter_pages(self, pdf_path, extract, *args):
+        """Yield extract(page, *args) for each page in order, sharding page ranges across
+        processes for large PDFs
+        
+        pdf_path may also be a binary file object, which is always read in this process.
+        """
+        with ExitStack() as stack:
+            with pipeline_metrics.timed('pdf_open'):
+                pdf = stack.enter_context(open_pdf(pdf_path))
+                page_count = len(pdf.pages)
+            if (self.parse_workers <= 1 or page_count < self.parallel_page_threshold
+                    or not isinstance(pdf_path, str)):
+                for page in pdf.pages:
+                    started = time.perf_counter()
+                    result = extract(page, *args)
+                    # Drop pdfplumber's per-page caches, text map included, once the page is done
+                    page.close()
+                    elapsed = time.perf_counter() - started
+                    self._record_pages(elapsed, [elapsed])
+                    yield result
+                return
+        
+        # Split pages into contiguous ranges, one or more per worker
+        chunk_size = max(1, -(-page_count // (self.parse_workers * 2)))
+        ranges = [(start, min(start + chunk_size, page_count))
+                  for start in range(0, page_count, chunk_size)]
+        
+        # Keep a bounded window of ranges in flight so results don't pile up in memory
+        window = self.parse_workers * 2
+        futures = deque()
+        for start, stop in ranges:
+            futures.append(submit_page_task(self.parse_workers, extract_page_range, pdf_path, start, stop,
+                                            extract, *args))
+            if len(futures) >= window:
+                yield from self._wait_for_pages(futures.popleft())
+        while futures:
+            yield from self._wait_for_pages(futures.popleft())
+
+    def _wait_for_pages(self, future):
+        started = time.perf_counter()
+        pages = future.result()
+        self._record_pages(time.perf_counter() - started, [seconds for _, seconds in pages])
+        return [result for result, _ in pages]
+
+    def _record_pages(self, waited, page_seconds):
+        self.extract_seconds += waited
+        self.page_count += len(page_seconds)
+        for seconds in page_seconds:
+            pipeline_metrics.observe('page_extract', seconds)
+
+    def extract_text(self, pdf_path):
+        """Extract the full document text"""
+        return "\n".join(self.iter_page_texts(pdf_path))
+
+    def start_statement(self):
+        """Reset per-statement state before parsing a new document"""
+        self.bank_type = self.bank
+        self.table_layout = None
+        self.balance_check = None
+        self.date_format = None
+        self.date_samples = []
+        self.page_count = 0
+        self.line_count = 0
+        self.extract_seconds = 0.0
+        self.categorize_seconds = 0.0
+
+    def read_first_page(self, pdf_path):
+        """(metadata, words) of the first page, reusing what statement_parser_for already read"""
+        if self.first_page is not None and self.first_page[0] == pdf_path:
+            _, metadata, words = self.first_page
+        else:
+            metadata, words = read_first_page(pdf_path)
+        self.first_page = None
+        return metadata, words
+
+    def iter_records(self, pdf_path):
+        """Yield (date string, description, debit, credit, balance, category) per transaction
+        
+        Statements with a recognisable table header are read column by column from
+        word positions, with the layout detected once and reused on every page.
+        Anything else, and OCR'd scans, are read as text lines matched against the
+        line grammar.
+        """
+        self.start_statement()
+        if self.ocr:
+            # Scans have no words to read up front; the bank comes from the first OCR'd page
+            page_texts = self.iter_pages(pdf_path, extract_page_ocr_text)
+        else:
+            # The bank and table layout come from the first page alone, before extraction starts
+            metadata, words = self.read_first_page(pdf_path)
+            if self.bank_type is None:
+                self.bank_type = detect_bank(words_text(words), metadata)
+            if EXTRACTION_MODE == 'auto':
+                self.table_layout = TableLayout.detect(words)
+            page_texts = self.iter_page_texts(pdf_path)
+        
+        if self.table_layout is None:
+            for line in self.iter_lines(page_texts):
+                fields = self.parse_fields(line)
+                if fields:
+                    yield fields
+            return
+        
+        for rows in self.iter_pages(pdf_path, extract_page_rows, self.table_layout):
+            self.line_count += len(rows)
+            for date_str, description, debit, credit, balance in rows:
+                started = time.perf_counter()
+                category = self.categorize_transaction(description)
+                self.categorize_seconds += time.perf_counter() - started
+                yield date_str, description, debit, credit, balance, category
+
+    def iter_lines(self, page_texts):
+        """Yield text lines page by page, detecting the bank from the first page if still unknown"""
+        for text in page_texts:
+            if self.bank_type is None:
+                self.bank_type = detect_bank(text)
+            lines = text.split('\n')
+            self.line_count += len(lines)
+            yield from lines
+
+    def match_line(self, line):
+        """Split a statement line into (date, description, amounts, markers) with one grammar match, or None
+        
+        Amounts are negative when written with a minus sign or Dr; markers holds each
+        amount's 'cr' or 'dr' marker, or '' when it has none.
+        """
+        grammar = self.line_grammar or LINE_GRAMMARS.get(self.bank_type, GENERIC_LINE_GRAMMAR)
+        match = grammar.search(line)
+        if match is None and grammar is not GENERIC_LINE_GRAMMAR:
+            match = GENERIC_LINE_GRAMMAR.search(line)
+        if match is None:
+            return None
+        
+        description = match.group('description').strip()
+        if len(description) <= 3:
+            return None
         
-        for category, keywords in self.categories.items():
-            if category == 'Other':
+        # Amounts are the numeric columns after the description; zero columns are ignored
+        amounts = []
+        markers = []
+        for sign, value, marker in AMOUNT_TOKEN.findall(match.group('amounts')):
+            amount = float(value.replace(',', ''))
+            if amount == 0:
                 continue
-            for keyword in keywords:
-                if keyword in description_lower:
-                    return category
+            marker = marker.lower()
+            amounts.append(-amount if sign or marker == 'dr' else amount)
+            markers.append(marker)
+        if not amounts:
+            return None
+        
+        return match.group('date'), description, amounts, markers
+
+    def parse_fields(self, line):
+        """Parse a statement line into (date string, description, debit, credit, balance, category), or None"""
+        matched = self.match_line(line)
+        if matched is None:
+            return None
+        
+        try:
+            date_str, description, amounts, markers = matched
+            
+            # Determine debit/credit based on transaction description
+            is_debit = DEBIT_KEYWORD_MATCHER.contains_any(description.lower())
+            
+            if len(amounts) >= 3:
+                # Format: Date, Description, Debit, Credit, Balance
+                debit = abs(amounts[0]) if is_debit else 0
+                credit = abs(amounts[1]) if not is_debit else 0
+            else:
+                # Format: Date, Description, Amount, Balance; as in tables, a minus sign
+                # or Dr/Cr marker on the amount overrides the keyword guess
+                amount = amounts[0]
+                if amount < 0 or markers[0] == 'dr':
+                    is_debit = True
+                elif markers[0] == 'cr':
+                    is_debit = False
+                debit = abs(amount) if is_debit else 0
+                credit = abs(amount) if not is_debit else 0
+            # A Dr (overdrawn) balance is negative, like a table's Balance column
+            balance = amounts[-1] if len(amounts) > 1 else 0
+            
+            # Categorize transaction
+            started = time.perf_counter()
+            category = self.categorize_transaction(description)
+            self.categorize_seconds += time.perf_counter() - started
+            
+            return date_str, description.strip(), debit, credit, balance, category
+        except (ValueError, IndexError):
+            return None
+
+    def parse_line(self, line):
+        """Parse a single statement line into a transaction dict, or None"""
+        fields = self.parse_fields(line)
+        if fields is None:
+            return None
         
-        return 'Other'
+        date_str, description, debit, credit, balance, category = fields
+        return {
+            'Date': self.parse_date(date_str),
+            'Description': description,
+            'Debit': debit,
+            'Credit': credit,
+            'Balance': balance,
+            'Category': category
+        }
+
+    def iter_transactions(self, pdf_path):
+        """Stream transactions as each page is parsed (pages -> rows -> transactions)"""
+        for date_str, description, debit, credit, balance, category in self.iter_records(pdf_path):
+            yield {
+                'Date': self.parse_date(date_str),
+                'Description': description,
+                'Debit': debit,
+                'Credit': credit,
+                'Balance': balance,
+                'Category': category
+            }
+
+    def parse_into(self, pdf_path, buffer):
+        """Append every transaction in the PDF straight onto a TransactionBuffer"""
+        start = len(buffer)
+        date_strs = []
+        started = time.perf_counter()
+        for date_str, description, debit, credit, balance, category in self.iter_records(pdf_path):
+            date_strs.append(date_str)
+            buffer.append(None, description, to_paise(debit), to_paise(credit), to_paise(balance),
+                          category, self.bank_type)
+        
+        # Page extraction and categorization run inside the loop but are reported separately
+        pipeline_metrics.observe('line_parse', time.perf_counter() - started
+                                 - self.extract_seconds - self.categorize_seconds)
+        pipeline_metrics.observe('categorize', self.categorize_seconds)
+        
+        # Dates are converted in one vectorized pass once the statement's format is known
+        with pipeline_metrics.timed('date_parse'):
+            buffer.set_dates(start, self.parse_dates(date_strs))
+        
+        # Debit/credit guessed from keywords is checked, and fixed, against the running balance
+        with pipeline_metrics.timed('balance_check'):
+            self.balance_check = check_balances(buffer, start)
+        pipeline_metrics.increment('rows_corrected', self.balance_check['corrected'])
+        pipeline_metrics.increment('rows_flagged', self.balance_check['flagged'])
+        
+        pipeline_metrics.increment('pages', self.page_count)
+        pipeline_metrics.increment('lines', self.line_count)
+        pipeline_metrics.increment('transactions', len(buffer) - start)
+        return buffer
 
     def parse_pdf(self, pdf_path):
         """Parse PDF and extract transaction data"""
-        transactions = []
-        
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                full_text = ""
-                for page in pdf.pages:
-                    full_text += page.extract_text() or ""
-                
-                # Detect bank type
-                bank_type = self.detect_bank_type(full_text)
-                
-                # Extract transactions using generic pattern
-                lines = full_text.split('\n')
-                
-                for line in lines:
-                    # Look for lines that contain dates and amounts
-                    date_match = re.search(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', line)
-                    if date_match:
-                        # Extract potential transaction data
-                        parts = line.split()
-                        if len(parts) >= 4:
-                            try:
-                                date_str = date_match.group(1)
-                                
-                                # Find amounts in the line (numbers with optional decimals and commas)
-                                amounts = re.findall(r'[\d,]+\.?\d*', line)
-                                amounts = [amt.replace(',', '') for amt in amounts if float(amt.replace(',', '')) > 0]
-                                
-                                if len(amounts) >= 1:
-                                    # Extract description (text between date and first amount)
-                                    date_end = date_match.end()
-                                    first_amount_start = line.find(amounts[0], date_end)
-                                    description = line[date_end:first_amount_start].strip()
-                                    
-                                    if description and len(description) > 3:
-                                        # Determine debit/credit based on transaction description
-                                        is_debit = any(keyword in description.lower() for keyword in 
-                                                     ['withdrawal', 'purchase', 'payment', 'debit', 'transfer out'])
-                                        
-                                        if len(amounts) >= 3:
-                                            # Format: Date, Description, Debit, Credit, Balance
-                                            debit = float(amounts[0]) if is_debit else 0
-                                            credit = float(amounts[1]) if not is_debit else 0
-                                            balance = float(amounts[-1])
-                                        else:
-                                            # Format: Date, Description, Amount, Balance
-                                            amount = float(amounts[0])
-                                            debit = amount if is_debit else 0
-                                            credit = amount if not is_debit else 0
-                                            balance = float(amounts[-1]) if len(amounts) > 1 else 0
-                                        
-                                        # Categorize transaction
-                                        category = self.categorize_transaction(description)
-                                        
-                                        transaction = {
-                                            'Date': self.parse_date(date_str),
-                                            'Description': description.strip(),
-                                            'Debit': debit,
-                                            'Credit': credit,
-                                            'Balance': balance,
-                                            'Category': category
-                                        }
-                                        transactions.append(transaction)
-                                        
-                            except (ValueError, IndexError):
-                                continue
-                
+            transactions = list(self.iter_transactions(pdf_path))
         except Exception as e:
             print(f"Error parsing PDF: {str(e)}")
             # Return sample data if parsing fails
@@ -189,28 +1250,28 @@ class BankStatementParser:
             return self.get_sample_transactions()
         
         return transactions
+
+    def parse_pdf_columnar(self, pdf_path):
+        """Parse PDF into a TransactionBuffer, falling back to sample data like parse_pdf"""
+        try:
+            buffer = self.parse_into(pdf_path, TransactionBuffer())
+        except Exception as e:
+            print(f"Error parsing PDF: {str(e)}")
+            buffer = None
+        
+        if not buffer:
+            # Sample data is not checked against anything
+            self.balance_check = None
+            return TransactionBuffer.from_records(self.get_sample_transactions())
+        return buffer
     
     def extract_transaction_from_line(self, line, bank_type):
         """Extract transaction details from a single line"""
         try:
-            # Common patterns for Indian banks
-            date_patterns = [
-                r'(\d{2}/\d{2}/\d{4})',
-                r'(\d{2}-\d{2}-\d{4})',
-                r'(\d{2}\.\d{2}\.\d{4})',
-                r'(\d{4}-\d{2}-\d{2})'
-            ]
-            
-            # Amount patterns (Indian number format with commas)
-            amount_patterns = [
-                r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-                r'(\d+\.?\d*)'
-            ]
-            
             # Try to find date in line
             date_match = None
-            for pattern in date_patterns:
-                date_match = re.search(pattern, line)
+            for pattern in LINE_DATE_PATTERNS:
+                date_match = pattern.search(line)
                 if date_match:
                     break
             
@@ -220,13 +1281,13 @@ class BankStatementParser:
             date_str = date_match.group(1)
             
             # Split line into parts for analysis
-            parts = re.split(r'\s{2,}', line)  # Split on multiple spaces
+            parts = LINE_PART_SEPARATOR.split(line)  # Split on multiple spaces
             
             # Find amounts in the line
             amounts = []
             for part in parts:
-                for pattern in amount_patterns:
-                    matches = re.findall(pattern, part.replace(',', ''))
+                for pattern in LINE_AMOUNT_PATTERNS:
+                    matches = pattern.findall(part.replace(',', ''))
                     for match in matches:
                         try:
                             amount = float(match)
@@ -297,18 +1358,54 @@ class BankStatementParser:
         
         return transactions
 
+    def detect_date_format(self, date_strs):
+        """Pick the statement's date format from its first few dates"""
+        votes = Counter()
+        for date_str in date_strs[:DATE_FORMAT_SAMPLE_SIZE]:
+            for fmt in DATE_FORMATS:
+                if parse_date_with_format(date_str, fmt) is not None:
+                    votes[fmt] += 1
+                    break
+        self.date_format = votes.most_common(1)[0][0] if votes else None
+        return self.date_format
+
+    def parse_date_value(self, date_str):
+        """Parse a statement date string to a datetime, or None"""
+        if self.date_format is not None:
+            parsed = parse_date_with_format(date_str, self.date_format)
+            if parsed is not None:
+                return parsed
+        elif len(self.date_samples) < DATE_FORMAT_SAMPLE_SIZE:
+            self.date_samples.append(date_str)
+            if len(self.date_samples) == DATE_FORMAT_SAMPLE_SIZE:
+                self.detect_date_format(self.date_samples)
+        
+        # Try different date formats
+        for fmt in DATE_FORMATS:
+            parsed = parse_date_with_format(date_str, fmt)
+            if parsed is not None:
+                return parsed
+        return None
+
+    def parse_dates(self, date_strs):
+        """Parse many date strings at once to a datetime64[s] array (NaT where unparseable)"""
+        if not date_strs:
+            return np.array([], dtype='datetime64[s]')
+        
+        fmt = self.date_format or self.detect_date_format(date_strs) or DATE_FORMATS[0]
+        dates = pd.to_datetime(pd.Series(date_strs, dtype=object), format=fmt, errors='coerce')
+        
+        # Dates written in another format fall back to per-string parsing
+        missing = dates.isna().to_numpy()
+        if missing.any():
+            dates[missing] = [self.parse_date_value(date_str)
+                              for date_str, is_missing in zip(date_strs, missing) if is_missing]
+        return dates.to_numpy(dtype='datetime64[s]')
+
     def parse_date(self, date_str):
         """Parse date string to standard format"""
-        try:
-            # Try different date formats
-            for fmt in ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y']:
-                try:
-                    return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-            return date_str
-        except:
-            return date_str
+        parsed = self.parse_date_value(date_str)
+        return parsed.strftime('%Y-%m-%d') if parsed is not None else date_str
 
     def get_sample_transactions(self):
         """Return sample transactions for demo purposes"""
@@ -379,6 +1476,57 @@ class BankStatementParser:
             }
         ]
 
+# Statement parser class for each bank, filled in by @register_statement_parser
+STATEMENT_PARSERS = {}
+
+def register_statement_parser(cls):
+    STATEMENT_PARSERS[cls.bank] = cls
+    return cls
+
+@register_statement_parser
+class SBIStatementParser(BankStatementParser):
+    bank = 'SBI'
+    patterns = BANK_PATTERNS['SBI']
+    line_grammar = LINE_GRAMMARS['SBI']
+
+@register_statement_parser
+class ICICIStatementParser(BankStatementParser):
+    bank = 'ICICI'
+    patterns = BANK_PATTERNS['ICICI']
+    line_grammar = LINE_GRAMMARS['ICICI']
+
+@register_statement_parser
+class HDFCStatementParser(BankStatementParser):
+    bank = 'HDFC'
+    patterns = BANK_PATTERNS['HDFC']
+    line_grammar = LINE_GRAMMARS['HDFC']
+
+@register_statement_parser
+class KotakStatementParser(BankStatementParser):
+    bank = 'KOTAK'
+    patterns = BANK_PATTERNS['KOTAK']
+    line_grammar = LINE_GRAMMARS['KOTAK']
+
+@register_statement_parser
+class AxisStatementParser(BankStatementParser):
+    bank = 'AXIS'
+    patterns = BANK_PATTERNS['AXIS']
+    line_grammar = LINE_GRAMMARS['AXIS']
+
+def statement_parser_for(pdf_path, **kwargs):
+    """The registered parser for a statement's bank, chosen from its first page and metadata
+
+    Unknown banks, and files that can't be opened, get the generic BankStatementParser;
+    unreadable files then fail inside the parser as before.
+    """
+    try:
+        metadata, words = read_first_page(pdf_path)
+    except Exception:
+        return BankStatementParser(**kwargs)
+    parser = STATEMENT_PARSERS.get(detect_bank(words_text(words), metadata), BankStatementParser)(**kwargs)
+    parser.first_page = (pdf_path, metadata, words)
+    return parser
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -399,140 +1547,1112 @@ def upload_file():
         # Get optional contact details
         whatsapp_number = request.form.get('whatsapp_number', '').strip()
         email_address = request.form.get('email_address', '').strip()
+        if whatsapp_number or email_address:
+            notification_dispatcher.ensure_started()
+        run_async = request.values.get('async', '').strip().lower() in ('1', 'true', 'yes')
         
         # Generate unique filename
         unique_id = str(uuid.uuid4())
         filename = secure_filename(f"{unique_id}_{file.filename}")
         filepath = os.path.join(UPLOAD_FOLDER, filename)
         
-        # Save uploaded file
-        file.save(filepath)
+        # Refuse async work before touching disk if the queue is already full
+        if run_async and job_queue.is_full():
+            return queue_full_response()
+        pipeline_metrics.increment('uploads')
         
-        # Parse the PDF
-        parser = BankStatementParser()
-        transactions = parser.parse_pdf(filepath)
+        # Identical statements parsed recently are served from the result cache
+        content_hash = stream_sha256(file.stream)
+        cached = result_cache.get(content_hash)
+        if cached is not None:
+            result = serve_cached_result(cached, whatsapp_number, email_address)
+            if run_async:
+                job_queue.add_completed(unique_id, result)
+                return jsonify({
+                    'success': True,
+                    'message': 'File processed successfully',
+                    'job_id': unique_id,
+                    'status': 'done',
+                    'status_url': f"/jobs/{unique_id}"
+                }), 202
+            return jsonify(result)
         
-        # Create DataFrame
-        df = pd.DataFrame(transactions)
+        # Preflight keeps encrypted, unreadable and scanned statements away from the text parser
+        source = getattr(file.stream, 'name', None) or file.stream
+        with pipeline_metrics.timed('preflight'):
+            preflight = preflight_pdf(source)
+        pipeline_metrics.increment(f"preflight_{preflight['kind']}")
+        if preflight['kind'] == 'encrypted':
+            return jsonify({
+                'error': 'This statement is password protected, please upload an unlocked copy',
+                'status': 'encrypted',
+                'preflight': preflight
+            }), 422
+        if preflight['kind'] == 'unreadable':
+            return jsonify({
+                'error': 'This file could not be read as a PDF',
+                'status': 'unreadable',
+                'preflight': preflight
+            }), 422
+        if preflight['kind'] == 'empty':
+            return jsonify({
+                'error': 'This statement has no text or scanned pages to read',
+                'status': 'empty',
+                'preflight': preflight
+            }), 422
+        if preflight['kind'] == 'scanned':
+            if not ocr_available():
+                return jsonify({
+                    'error': 'This statement is a scanned image and OCR is not available',
+                    'status': 'scanned',
+                    'preflight': preflight
+                }), 422
+            # OCR is slow, so scans always go to the background OCR queue
+            with pipeline_metrics.timed('file_save'):
+                file.save(filepath)
+            if not ocr_queue.submit(unique_id, filepath, whatsapp_number, email_address, content_hash, ocr=True):
+                os.remove(filepath)
+                return queue_full_response()
+            return jsonify({
+                'success': True,
+                'message': 'Scanned statement queued for OCR',
+                'job_id': unique_id,
+                'status': 'queued',
+                'queue': 'ocr',
+                'preflight': preflight,
+                'status_url': f"/jobs/{unique_id}"
+            }), 202
         
-        # Generate summary
-        summary = generate_summary(df)
+        if run_async:
+            # Pool workers open the statement themselves, so it has to outlive this request
+            with pipeline_metrics.timed('file_save'):
+                file.save(filepath)
+            if not job_queue.submit(unique_id, filepath, whatsapp_number, email_address, content_hash):
+                os.remove(filepath)
+                return queue_full_response()
+            return jsonify({
+                'success': True,
+                'message': 'File queued for processing',
+                'job_id': unique_id,
+                'status': 'queued',
+                'status_url': f"/jobs/{unique_id}"
+            }), 202
         
-        # Save processed data
-        csv_filename = f"{unique_id}_statement.csv"
-        excel_filename = f"{unique_id}_statement.xlsx"
+        # Parse straight from the spooled upload: in memory, or the spill file's path
+        with parse_source(file.stream, preflight['pages']) as source:
+            result, transactions = process_statement(source, unique_id, whatsapp_number, email_address,
+                                                     keep_source=True)
+        cleanup_time = register_download_files(unique_id)
+        result_cache.put(content_hash, unique_id, result, transactions, cleanup_time)
+        result['cleanup_time'] = cleanup_time.strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify(result)
         
-        csv_path = os.path.join(DOWNLOAD_FOLDER, csv_filename)
-        excel_path = os.path.join(DOWNLOAD_FOLDER, excel_filename)
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+
+@contextmanager
+def parse_source(stream, page_count):
+    """What to parse a spooled upload from: its spill file's path, or the stream
+    
+    In-memory uploads long enough to be sharded across the page pool, whose
+    workers open statements by path, are written to UPLOAD_SPOOL_DIR for the
+    duration of the parse.
+    """
+    name = getattr(stream, 'name', None)
+    if name:
+        yield name
+    elif PARSE_WORKERS > 1 and page_count is not None and page_count >= PARALLEL_PAGE_THRESHOLD:
+        with tempfile.NamedTemporaryFile(dir=UPLOAD_SPOOL_DIR, prefix='upload-', suffix='.spool') as spill:
+            spill.write(stream.getbuffer())
+            spill.flush()
+            yield spill.name
+    else:
+        yield stream
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    return jsonify({'error': f'Upload is larger than the {request.max_content_length // (1024 * 1024)} MB limit'}), 413
+
+def process_statement(filepath, unique_id, whatsapp_number='', email_address='', keep_source=False, ocr=False):
+    """Parse an uploaded statement, write the exports and send notifications
+    
+    filepath may also be a binary file object. The file is removed afterwards
+    unless keep_source is set. Scanned statements are read with OCR and, unlike
+    text ones, fail rather than fall back to sample data when nothing is found.
+    
+    Returns the response payload and the parsed transactions.
+    """
+    started = time.perf_counter()
+    try:
+        # Parse the PDF
+        if ocr:
+            parser, transactions = parse_statement(filepath, ocr=True)
+        else:
+            parser = statement_parser_for(filepath)
+            transactions = parser.parse_pdf_columnar(filepath)
         
-        # Save CSV
-        df.to_csv(csv_path, index=False)
+        # Generate summary straight from the typed columns, collecting each row's month
+        with pipeline_metrics.timed('summary'):
+            summary_accumulator = SummaryAccumulator()
+            months = summary_accumulator.add_buffer(transactions)
+            summary = summary_accumulator.to_summary()
         
-        # Save Excel with formatting
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Transactions', index=False)
-            
-            # Add summary sheet
-            summary_df = pd.DataFrame([
-                ['Total Transactions', len(df)],
-                ['Total Debits', f"₹{df['Debit'].sum():,.2f}"],
-                ['Total Credits', f"₹{df['Credit'].sum():,.2f}"],
-                ['Net Amount', f"₹{(df['Credit'].sum() - df['Debit'].sum()):,.2f}"],
-                ['Opening Balance', f"₹{df['Balance'].iloc[0]:,.2f}" if len(df) > 0 else "₹0"],
-                ['Closing Balance', f"₹{df['Balance'].iloc[-1]:,.2f}" if len(df) > 0 else "₹0"]
-            ], columns=['Metric', 'Value'])
-            summary_df.to_excel(writer, sheet_name='Summary', index=False)
-            
-            # Add category-wise summary sheet
-            if summary['category_expenses']:
-                category_df = pd.DataFrame([
-                    [category, f"₹{amount:,.2f}"] 
-                    for category, amount in summary['category_expenses'].items()
-                ], columns=['Category', 'Amount Spent'])
-                category_df.to_excel(writer, sheet_name='Categories', index=False)
-        
-        # Register files for cleanup
-        cleanup_time = datetime.now() + timedelta(minutes=FILE_CLEANUP_MINUTES)
-        file_registry[unique_id] = {
-            'csv_path': csv_path,
-            'excel_path': excel_path,
-            'cleanup_time': cleanup_time
-        }
+        # Create DataFrame over the buffer's arrays
+        df = transactions.to_frame()
+        df['Month'] = months
         
-        # Schedule file cleanup
-        schedule_file_cleanup(unique_id, FILE_CLEANUP_MINUTES * 60)
+        # Save processed data in compact binary form; CSV and Excel are rendered
+        # on first download
+        paths = export_paths(unique_id)
+        with pipeline_metrics.timed('data_write'):
+            df.to_pickle(paths['data'])
         
         # Send WhatsApp notification (simulated)
         if whatsapp_number:
-            send_whatsapp_notification(whatsapp_number, summary, unique_id)
+            with pipeline_metrics.timed('notifications'):
+                send_whatsapp_notification(whatsapp_number, summary, unique_id)
         
-        # Send email report if requested
+        # Send email report if requested; the attachment needs the Excel file now
         if email_address:
-            send_email_report(email_address, df, summary, excel_path)
+            with pipeline_metrics.timed('xlsx_write'):
+                write_export_atomically(paths['excel'], lambda path: write_excel_report(df, summary, path))
+            with pipeline_metrics.timed('notifications'):
+                send_email_report(email_address, df, summary, paths['excel'])
         
-        # Clean up uploaded file
-        os.remove(filepath)
-        
-        return jsonify({
+        return {
             'success': True,
             'message': 'File processed successfully',
-            'csv_file': csv_filename,
-            'excel_file': excel_filename,
+            'csv_file': os.path.basename(paths['csv']),
+            'excel_file': os.path.basename(paths['excel']),
             'summary': summary,
             'transaction_count': len(df),
+            'balance_check': parser.balance_check,
+            'ocr': ocr,
             'whatsapp_sent': bool(whatsapp_number),
-            'email_sent': bool(email_address),
-            'cleanup_time': cleanup_time.strftime('%Y-%m-%d %H:%M:%S')
-        })
+            'email_sent': bool(email_address)
+        }, transactions
+    finally:
+        # Clean up uploaded file
+        if not keep_source and os.path.exists(filepath):
+            os.remove(filepath)
+        pipeline_metrics.observe('process_statement', time.perf_counter() - started)
+
+def parse_statement(filepath, ocr=False):
+    """Parse a statement into a balance-checked TransactionBuffer, without the sample-data fallback
+    
+    Returns the parser, which holds the balance check, and the buffer; raises
+    ValueError when no transactions are found.
+    """
+    if ocr:
+        parser = BankStatementParser(ocr=True)
+        with pipeline_metrics.timed('ocr'):
+            transactions = parser.parse_into(filepath, TransactionBuffer())
+        if not transactions:
+            raise ValueError('No transactions could be read from the scanned statement')
+    else:
+        parser = statement_parser_for(filepath)
+        transactions = parser.parse_into(filepath, TransactionBuffer())
+        if not transactions:
+            raise ValueError('No transactions found')
+    return parser, transactions
+
+def export_paths(unique_id):
+    """Paths of the stored transactions and the exports rendered from them"""
+    return {
+        'data': os.path.join(DOWNLOAD_FOLDER, f"{unique_id}_statement.pkl"),
+        'csv': os.path.join(DOWNLOAD_FOLDER, f"{unique_id}_statement.csv"),
+        'excel': os.path.join(DOWNLOAD_FOLDER, f"{unique_id}_statement.xlsx")
+    }
+
+def write_export_atomically(path, writer):
+    """Write via a temp file and rename, so concurrent renders never expose a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp' + os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def render_excel_export(unique_id):
+    """Return the path of the Excel export, rendering it from stored data on first use
+    
+    CSV is never rendered to disk; downloads stream it from the stored data.
+    """
+    paths = export_paths(unique_id)
+    path = paths['excel']
+    if os.path.exists(path):
+        return path
+    if not os.path.exists(paths['data']):
+        return None
+    
+    df = pd.read_pickle(paths['data'])
+    summary = generate_summary(df)
+    with pipeline_metrics.timed('xlsx_write'):
+        write_export_atomically(path, lambda tmp_path: write_excel_report(df, summary, tmp_path))
+    return path
+
+def register_download_files(unique_id):
+    """Register stored data and exports for cleanup and return the cleanup time"""
+    cleanup_time = datetime.now() + timedelta(minutes=FILE_CLEANUP_MINUTES)
+    file_reaper.register(unique_id, list(export_paths(unique_id).values()), cleanup_time)
+    return cleanup_time
+
+def stream_sha256(stream):
+    """SHA-256 of a binary stream's contents, read in chunks; leaves the stream rewound"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    if isinstance(stream, io.BytesIO):
+        digest.update(stream.getbuffer())
+    else:
+        for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+            digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+class ResultCache:
+    """LRU cache of processed statements keyed by content hash, parser and category version
+    
+    Entries expire with their export files (FILE_CLEANUP_MINUTES), so a cache hit
+    never outlives the privacy window of the upload that produced it.
+    """
+    
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _key(self, content_hash):
+        return f"{content_hash}:{PARSER_VERSION}:{current_category_version()}"
+    
+    def _is_live(self, entry):
+        return (entry['cleanup_time'] > datetime.now()
+                and all(os.path.exists(path) for path in entry['paths']))
+    
+    def get(self, content_hash):
+        key = self._key(content_hash)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not self._is_live(entry):
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, content_hash, unique_id, result, transactions, cleanup_time):
+        if self.max_entries <= 0:
+            return
+        entry = {
+            'unique_id': unique_id,
+            'result': result,
+            'transactions': transactions,
+            'cleanup_time': cleanup_time,
+            'paths': [export_paths(unique_id)['data']]
+        }
+        key = self._key(content_hash)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def discard(self, unique_id):
+        """Drop entries whose files belong to unique_id"""
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry['unique_id'] == unique_id]:
+                del self.entries[key]
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+result_cache = ResultCache(RESULT_CACHE_SIZE)
+
+def serve_cached_result(entry, whatsapp_number, email_address):
+    """Build an upload response from a cache entry, sending any requested notifications"""
+    unique_id = entry['unique_id']
+    summary = entry['result']['summary']
+    
+    if whatsapp_number:
+        send_whatsapp_notification(whatsapp_number, summary, unique_id)
+    
+    if email_address:
+        excel_path = render_excel_export(unique_id)
+        send_email_report(email_address, entry['transactions'].to_frame(), summary, excel_path)
+    
+    return dict(entry['result'],
+                whatsapp_sent=bool(whatsapp_number),
+                email_sent=bool(email_address),
+                cached=True,
+                cleanup_time=entry['cleanup_time'].strftime('%Y-%m-%d %H:%M:%S'))
+
+@app.route('/stats')
+def stats():
+    return jsonify({
+        'result_cache': result_cache.stats(),
+        'file_cleanup': file_reaper.stats(),
+        'notifications': notification_dispatcher.stats()
+    })
+
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 while this process is healthy enough to serve, 503 otherwise
+    
+    A full job queue is load, not ill health: async uploads get a 429 of their
+    own while sync uploads, downloads and status polls carry on.
+    """
+    checks = {
+        'upload_folder': os.access(UPLOAD_FOLDER, os.W_OK),
+        'download_folder': os.access(DOWNLOAD_FOLDER, os.W_OK),
+        'file_reaper': file_reaper.is_running(),
+        'notification_dispatcher': notification_dispatcher.is_running()
+    }
+    ok = all(checks.values())
+    return jsonify({'status': 'ready' if ok else 'unavailable', 'checks': checks}), 200 if ok else 503
+
+@app.route('/metrics')
+def metrics():
+    gauges = {'notification_dispatcher_up': int(notification_dispatcher.is_running())}
+    return Response(pipeline_metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+def profiling_requested():
+    """True when an admin asked for this request to be profiled"""
+    token = request.headers.get('X-Admin-Token', '')
+    return (bool(ADMIN_TOKEN) and request.headers.get('X-Profile') == '1'
+            and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()))
+
+@app.before_request
+def start_request_profile():
+    if profiling_requested():
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def attach_request_profile(response):
+    """Add the cProfile report of a profiled request to its JSON response"""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    payload = response.get_json(silent=True) if response.is_json else None
+    if isinstance(payload, dict):
+        payload['profile'] = report.getvalue()
+        response.set_data(app.json.dumps(payload))
+    return response
+
+@app.teardown_request
+def stop_request_profile(error=None):
+    # Requests that failed before after_request still stop their profiler
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+class LocalJobQueue:
+    """Bounded in-process job queue backed by a local process pool
+    
+    name is reported in job statuses; initializer runs once in each worker process.
+    """
+    
+    def __init__(self, max_workers, max_pending, name='default', initializer=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.name = name
+        self.initializer = initializer
+        self.jobs = {}
+        self.pool_futures = set()
+        self.lock = threading.Lock()
+        self.executor = None
+        self.executor_pid = None
+        self.executor_tasks = 0
+    
+    def _get_executor(self):
+        # Created lazily so importing the app never forks worker processes, and
+        # again in a forked child, which can't use its parent's pool
+        if (self.executor is not None and self.executor_pid == os.getpid()
+                and pool_needs_recycling(self.executor_tasks, self.max_workers)):
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        if self.executor is None or self.executor_pid != os.getpid():
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=pool_context,
+                                                initializer=self.initializer)
+            self.executor_pid = os.getpid()
+            self.executor_tasks = 0
+        self.executor_tasks += 1
+        return self.executor
+    
+    def _submit(self, fn, *args):
+        try:
+            future = self._get_executor().submit(run_with_metrics, fn, *args)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool and try once more
+            self.executor = None
+            future = self._get_executor().submit(run_with_metrics, fn, *args)
+        future.add_done_callback(merge_worker_metrics)
+        return future
+    
+    def run_in_pool(self, fn, arg_lists):
+        """Run fn once per argument tuple in the worker pool, outside the job registry
         
+        The runs count toward max_pending like jobs do; when they don't all fit,
+        nothing is run and None is returned. Otherwise returns the futures, whose
+        results are read with pool_result().
+        """
+        with self.lock:
+            if self._pending_count() + len(arg_lists) > self.max_pending:
+                return None
+            futures = [self._submit(fn, *args) for args in arg_lists]
+            self.pool_futures.update(futures)
+        for future in futures:
+            future.add_done_callback(self.pool_futures.discard)
+        return futures
+    
+    def _pending_count(self):
+        return (sum(1 for job in self.jobs.values() if not job['future'].done())
+                + sum(1 for future in list(self.pool_futures) if not future.done()))
+    
+    def _prune_finished(self):
+        cutoff = time.time() - FILE_CLEANUP_MINUTES * 60
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job['finished_at'] and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+    
+    def is_full(self):
+        with self.lock:
+            return self._pending_count() >= self.max_pending
+    
+    def submit(self, job_id, filepath, whatsapp_number, email_address, content_hash=None, ocr=False):
+        """Queue a statement for processing; returns False when the queue is full"""
+        with self.lock:
+            self._prune_finished()
+            if self._pending_count() >= self.max_pending:
+                return False
+            future = self._submit(process_statement, filepath, job_id, whatsapp_number, email_address,
+                                  False, ocr)
+            self.jobs[job_id] = {
+                'future': future,
+                'submitted_at': time.time(),
+                'finished_at': None,
+                'result': None
+            }
+        future.add_done_callback(lambda f: self._on_done(job_id, f, content_hash))
+        return True
+    
+    def add_completed(self, job_id, result):
+        """Record a job whose result is already known, e.g. a result cache hit"""
+        future = Future()
+        future.set_result(None)
+        now = time.time()
+        with self.lock:
+            self._prune_finished()
+            self.jobs[job_id] = {
+                'future': future,
+                'submitted_at': now,
+                'finished_at': now,
+                'result': result
+            }
+    
+    def _on_done(self, job_id, future, content_hash):
+        result = None
+        if not future.cancelled() and future.exception() is None:
+            result, transactions = pool_result(future)
+            cleanup_time = register_download_files(job_id)
+            if content_hash:
+                result_cache.put(content_hash, job_id, result, transactions, cleanup_time)
+            result = dict(result, cleanup_time=cleanup_time.strftime('%Y-%m-%d %H:%M:%S'))
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job:
+                job['finished_at'] = time.time()
+                job['result'] = result
+    
+    def status(self, job_id):
+        """Return a JSON-serialisable status dict, or None for unknown jobs"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            future = job['future']
+            info = {
+                'job_id': job_id,
+                'queue': self.name,
+                'submitted_at': datetime.fromtimestamp(job['submitted_at']).strftime('%Y-%m-%d %H:%M:%S')
+            }
+            if not future.done() or job['finished_at'] is None:
+                info['status'] = 'running' if future.running() else 'queued'
+            elif future.cancelled():
+                info['status'] = 'failed'
+                info['error'] = 'Job was cancelled'
+            elif future.exception() is not None:
+                info['status'] = 'failed'
+                info['error'] = f'Processing failed: {str(future.exception())}'
+            else:
+                info['status'] = 'done'
+                info['result'] = job['result']
+            return info
+
+def merge_worker_metrics(future):
+    if not future.cancelled() and future.exception() is None:
+        pipeline_metrics.merge(future.result()[1])
+
+def pool_result(future):
+    """Result of a job run through LocalJobQueue, without the worker's metrics"""
+    return future.result()[0]
+
+def init_job_worker():
+    # Jobs already run one per process; a page pool nested inside a job worker
+    # would oversubscribe the CPUs and keep the worker from exiting cleanly
+    global PARSE_WORKERS
+    PARSE_WORKERS = 1
+
+job_queue = LocalJobQueue(ASYNC_WORKERS, ASYNC_QUEUE_SIZE, initializer=init_job_worker)
+ocr_queue = LocalJobQueue(max(OCR_WORKERS, 1), OCR_QUEUE_SIZE, name='ocr', initializer=init_ocr_worker)
+
+def find_job(job_id):
+    """Status of a job in either queue, or None"""
+    return job_queue.status(job_id) or ocr_queue.status(job_id)
+
+def queue_full_response():
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(ASYNC_RETRY_AFTER_SECONDS)
+    return response
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    info = find_job(job_id)
+    if info is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(info)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    info = find_job(job_id)
+    if info is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if info['status'] == 'done':
+        return jsonify(info['result'])
+    if info['status'] == 'failed':
+        return jsonify({'error': info['error']}), 500
+    response = jsonify(info)
+    response.status_code = 202
+    response.headers['Retry-After'] = str(ASYNC_RETRY_AFTER_SECONDS)
+    return response
+
+def parse_statement_file(filepath):
+    """Parse one statement of a batch as a single upload would be, minus the sample-data fallback
+    
+    Returns the transactions as records, for merging, the balance check and the
+    statement's SummaryAccumulator, built here in the pool worker.
+    """
+    try:
+        preflight = preflight_pdf(filepath)
+        if preflight['kind'] == 'encrypted':
+            raise ValueError('Statement is password protected')
+        if preflight['kind'] == 'unreadable':
+            raise ValueError('File could not be read as a PDF')
+        if preflight['kind'] == 'empty':
+            raise ValueError('Statement has no text or scanned pages to read')
+        if preflight['kind'] == 'scanned' and not ocr_available():
+            raise ValueError('Statement is a scanned image and OCR is not available')
+        parser, transactions = parse_statement(filepath, ocr=preflight['kind'] == 'scanned')
+        summary_accumulator = SummaryAccumulator()
+        summary_accumulator.add_buffer(transactions)
+        df = transactions.to_frame()
+        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+        return df.to_dict('records'), parser.balance_check, summary_accumulator
+    finally:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+def transaction_key(transaction):
+    return (transaction['Date'], transaction['Description'], transaction['Debit'],
+            transaction['Credit'], transaction['Balance'])
+
+def sorted_date_order(dates):
+    """Indices that sort ISO date strings chronologically, stable, with unreadable dates last
+    
+    Sorted in numpy: pandas' Series.argsort marks missing values with -1 rather
+    than placing them.
+    """
+    if not dates:
+        return []
+    values = pd.to_datetime(pd.Series(dates, dtype=object), format='%Y-%m-%d', errors='coerce').to_numpy(dtype='datetime64[ns]')
+    return np.argsort(values, kind='stable').tolist()
+
+def merge_statements(statements):
+    """Merge per-file (transactions, SummaryAccumulator) pairs into one chronologically sorted list
+    
+    Statements for consecutive periods often repeat the rows around the month
+    boundary, so a row is dropped when an earlier statement already had it.
+    Repeats within a single statement are genuine and kept.
+    
+    Returns the merged transactions, the number of duplicates dropped and the
+    merged rows' summary: each statement's accumulator is merged in as is, and
+    only a statement that lost rows to an earlier one is folded again.
+    """
+    # Take statements in order of their first transaction so overlaps are credited to the earlier one
+    statements = [(transactions, accumulator) for transactions, accumulator in statements if transactions]
+    first_dates = [transactions[0]['Date'] for transactions, _ in statements]
+    ordered = [statements[i] for i in sorted_date_order(first_dates)]
+    seen = Counter()
+    merged = []
+    duplicates = 0
+    summary_accumulator = SummaryAccumulator()
+    for transactions, accumulator in ordered:
+        counts = Counter()
+        kept = []
+        for transaction in transactions:
+            key = transaction_key(transaction)
+            counts[key] += 1
+            if counts[key] <= seen[key]:
+                duplicates += 1
+                continue
+            kept.append(transaction)
+        seen |= counts
+        if len(kept) < len(transactions):
+            accumulator = SummaryAccumulator()
+            for transaction in kept:
+                accumulator.add(transaction)
+        summary_accumulator.merge(accumulator)
+        merged.extend(kept)
+    
+    merged = [merged[i] for i in sorted_date_order([transaction['Date'] for transaction in merged])]
+    if merged:
+        # Statements of different accounts can overlap in time, so the opening and
+        # closing balances are those of the merged rows in date order
+        summary_accumulator.opening = to_paise(merged[0]['Balance'])
+        summary_accumulator.closing = to_paise(merged[-1]['Balance'])
+    return merged, duplicates, summary_accumulator
+
+class BatchTracker:
+    """Tracks multi-statement batches: per-file parsing progress and the merged report"""
+    
+    def __init__(self):
+        self.batches = {}
+        self.lock = threading.Lock()
+    
+    def start(self, batch_id, uploads):
+        """Parse each (filename, filepath) upload in the job pool
+        
+        Returns False, starting nothing, when the job queue has no room for every file.
+        """
+        batch = {
+            'status': 'processing',
+            'submitted_at': time.time(),
+            'files': [{'filename': filename, 'status': 'queued', 'transaction_count': 0}
+                      for filename, _ in uploads],
+            'results': [None] * len(uploads),
+            'remaining': len(uploads),
+            'result': None,
+            'error': None
+        }
+        with self.lock:
+            self._prune_finished()
+            self.batches[batch_id] = batch
+        futures = job_queue.run_in_pool(parse_statement_file, [(filepath,) for _, filepath in uploads])
+        if futures is None:
+            with self.lock:
+                del self.batches[batch_id]
+            return False
+        for index, future in enumerate(futures):
+            future.add_done_callback(lambda f, index=index: self._on_file_done(batch_id, index, f))
+        return True
+    
+    def _prune_finished(self):
+        cutoff = time.time() - FILE_CLEANUP_MINUTES * 60
+        for batch_id in [batch_id for batch_id, batch in self.batches.items()
+                         if batch['status'] != 'processing' and batch['submitted_at'] < cutoff]:
+            del self.batches[batch_id]
+    
+    def _on_file_done(self, batch_id, index, future):
+        with self.lock:
+            batch = self.batches[batch_id]
+            file_info = batch['files'][index]
+            error = future.exception()
+            if error is None:
+                transactions, file_info['balance_check'], summary_accumulator = pool_result(future)
+                batch['results'][index] = (transactions, summary_accumulator)
+                file_info['status'] = 'done'
+                file_info['transaction_count'] = len(transactions)
+            else:
+                file_info['status'] = 'failed'
+                file_info['error'] = f'Processing failed: {str(error)}'
+            batch['remaining'] -= 1
+            finished = batch['remaining'] == 0
+        if finished:
+            # Merging and export run off the executor's callback thread
+            threading.Thread(target=self._finalize, args=(batch_id,), daemon=True).start()
+    
+    def _finalize(self, batch_id):
+        with self.lock:
+            batch = self.batches[batch_id]
+            statements = [result for result in batch['results'] if result is not None]
+            batch['results'] = None
+        try:
+            transactions, duplicates, summary_accumulator = merge_statements(statements)
+            if not transactions:
+                raise ValueError('No transactions found in any statement')
+            summary = summary_accumulator.to_summary()
+            
+            buffer = TransactionBuffer.from_records(transactions)
+            df = buffer.to_frame()
+            df['Month'] = month_keys(buffer.arrays()['Date'])
+            paths = export_paths(batch_id)
+            df.to_pickle(paths['data'])
+            cleanup_time = register_download_files(batch_id)
+            
+            result = {
+                'success': True,
+                'message': 'Statements merged successfully',
+                'csv_file': os.path.basename(paths['csv']),
+                'excel_file': os.path.basename(paths['excel']),
+                'summary': summary,
+                'transaction_count': len(df),
+                'duplicates_removed': duplicates,
+                'cleanup_time': cleanup_time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            with self.lock:
+                batch['status'] = 'done'
+                batch['result'] = result
+        except Exception as e:
+            with self.lock:
+                batch['status'] = 'failed'
+                batch['error'] = f'Processing failed: {str(e)}'
+    
+    def status(self, batch_id):
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            info = {
+                'batch_id': batch_id,
+                'status': batch['status'],
+                'files': [dict(file_info) for file_info in batch['files']],
+                'files_completed': len(batch['files']) - batch['remaining'],
+                'files_total': len(batch['files'])
+            }
+            if batch['result'] is not None:
+                info['result'] = batch['result']
+            if batch['error'] is not None:
+                info['error'] = batch['error']
+            return info
+
+batch_tracker = BatchTracker()
+
+def save_batch_uploads(batch_id, files):
+    """Save uploaded PDFs, and PDFs inside uploaded zips, returning (filename, path) pairs"""
+    uploads = []
+    
+    def add(filename, save):
+        if len(uploads) >= BATCH_MAX_FILES:
+            raise ValueError(f'At most {BATCH_MAX_FILES} statements per batch')
+        filepath = os.path.join(UPLOAD_FOLDER, secure_filename(f"{batch_id}_{len(uploads)}_{filename}"))
+        save(filepath)
+        uploads.append((filename, filepath))
+    
+    try:
+        for file in files:
+            if file.filename.lower().endswith('.zip'):
+                with zipfile.ZipFile(file.stream) as archive:
+                    for member in archive.infolist():
+                        name = os.path.basename(member.filename)
+                        if member.is_dir() or not allowed_file(name):
+                            continue
+                        if member.file_size > BATCH_MAX_FILE_BYTES:
+                            raise ValueError(f'{name} is too large')
+                        
+                        def extract(filepath, member=member):
+                            with archive.open(member) as source, open(filepath, 'wb') as target:
+                                shutil.copyfileobj(source, target)
+                        add(name, extract)
+            elif allowed_file(file.filename):
+                add(file.filename, file.save)
+            else:
+                raise ValueError(f'{file.filename} is not a PDF or zip file')
+    except Exception:
+        for _, filepath in uploads:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+        raise
+    return uploads
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    try:
+        files = [file for file in request.files.getlist('files') + request.files.getlist('file')
+                 if file.filename]
+        if not files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        if job_queue.is_full():
+            return queue_full_response()
+        
+        batch_id = str(uuid.uuid4())
+        try:
+            uploads = save_batch_uploads(batch_id, files)
+        except (ValueError, zipfile.BadZipFile) as e:
+            return jsonify({'error': str(e)}), 400
+        if not uploads:
+            return jsonify({'error': 'No PDF statements found'}), 400
+        
+        if not batch_tracker.start(batch_id, uploads):
+            for _, filepath in uploads:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+            return queue_full_response()
+        return jsonify({
+            'success': True,
+            'message': 'Statements queued for processing',
+            'batch_id': batch_id,
+            'status': 'processing',
+            'files_total': len(uploads),
+            'status_url': f"/batches/{batch_id}"
+        }), 202
+        
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
 
+@app.route('/batches/<batch_id>')
+def batch_status(batch_id):
+    info = batch_tracker.status(batch_id)
+    if info is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    return jsonify(info)
+
 @app.route('/download/<file_type>/<filename>')
 def download_file(file_type, filename):
     try:
-        file_path = os.path.join(DOWNLOAD_FOLDER, filename)
+        suffix = EXPORT_SUFFIXES.get(file_type)
+        if suffix is None:
+            return jsonify({'error': 'Invalid file type'}), 400
         
-        if not os.path.exists(file_path):
+        # Only exports can be downloaded; they are rendered from stored data on first request
+        unique_id = filename[:-len(suffix)]
+        if not filename.endswith(suffix) or secure_filename(filename) != filename or not unique_id:
             return jsonify({'error': 'File not found'}), 404
         
+        # CSV is streamed straight from the stored transactions, never written to disk
         if file_type == 'csv':
-            return send_file(file_path, as_attachment=True, download_name=filename, mimetype='text/csv')
-        elif file_type == 'excel':
-            return send_file(file_path, as_attachment=True, download_name=filename, 
-                           mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        else:
-            return jsonify({'error': 'Invalid file type'}), 400
+            data_path = export_paths(unique_id)['data']
+            if not os.path.exists(data_path):
+                return jsonify({'error': 'File not found'}), 404
+            return stream_csv_response(pd.read_pickle(data_path), filename)
+        
+        file_path = render_excel_export(unique_id)
+        if file_path is None:
+            return jsonify({'error': 'File not found'}), 404
+        return send_file(file_path, as_attachment=True, download_name=filename, 
+                       mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             
     except Exception as e:
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
 
-def schedule_file_cleanup(unique_id, delay_seconds):
-    """Schedule automatic file cleanup after specified delay"""
-    def cleanup_files():
-        time.sleep(delay_seconds)
-        if unique_id in file_registry:
-            file_info = file_registry[unique_id]
+def iter_csv_chunks(df, chunk_rows=CSV_STREAM_CHUNK_ROWS):
+    """Yield the DataFrame as CSV text a block of rows at a time"""
+    yield df.iloc[:0].to_csv(index=False)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=False)
+
+def gzip_chunks(chunks):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream_csv_response(df, filename):
+    """Chunked CSV download, gzip-encoded when the client accepts it"""
+    chunks = timed_chunks('csv_write', iter_csv_chunks(df))
+    headers = {'Content-Disposition': f'attachment; filename={filename}', 'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip']:
+        body = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    else:
+        body = (chunk.encode('utf-8') for chunk in chunks)
+    return Response(body, mimetype='text/csv', headers=headers)
+
+class FileReaper:
+    """Single background thread that deletes exported files when they expire
+    
+    Expiry times live in a min-heap so the thread only wakes for the next due
+    upload. The registry is mirrored to SQLite, so files registered before a
+    restart are still removed, and orphans are swept on startup.
+    """
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.registry = {}
+        self.heap = []
+        self.thread = None
+        self.pid = None
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('CREATE TABLE IF NOT EXISTS pending_files '
+                     '(unique_id TEXT PRIMARY KEY, paths TEXT NOT NULL, cleanup_at REAL NOT NULL)')
+        return conn
+    
+    def ensure_started(self):
+        """Start the reaper thread in this process, loading persisted entries first"""
+        with self.lock:
+            # A forked child inherits the object but not the thread
+            if self.thread is not None and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.registry = {}
+            self.heap = []
             try:
-                # Remove files if they exist
-                if os.path.exists(file_info['csv_path']):
-                    os.remove(file_info['csv_path'])
-                if os.path.exists(file_info['excel_path']):
-                    os.remove(file_info['excel_path'])
-                # Remove from registry
-                del file_registry[unique_id]
-                print(f"Cleaned up files for {unique_id}")
-            except Exception as e:
-                print(f"Error cleaning up files for {unique_id}: {e}")
-    
-    # Start cleanup thread
-    cleanup_thread = threading.Thread(target=cleanup_files)
-    cleanup_thread.daemon = True
-    cleanup_thread.start()
+                with closing(self._connect()) as conn:
+                    rows = conn.execute('SELECT unique_id, paths, cleanup_at FROM pending_files').fetchall()
+            except sqlite3.Error as e:
+                print(f"Error loading file registry: {e}")
+                rows = []
+            for unique_id, paths, cleanup_at in rows:
+                self.registry[unique_id] = {'paths': json.loads(paths), 'cleanup_at': cleanup_at}
+                heapq.heappush(self.heap, (cleanup_at, unique_id))
+            self.thread = threading.Thread(target=self._run, name='file-reaper', daemon=True)
+            self.thread.start()
+        self.sweep_orphans()
+    
+    def is_running(self):
+        return self.pid == os.getpid() and self.thread is not None and self.thread.is_alive()
+    
+    def register(self, unique_id, paths, cleanup_time):
+        self.ensure_started()
+        cleanup_at = cleanup_time.timestamp()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute('INSERT OR REPLACE INTO pending_files VALUES (?, ?, ?)',
+                             (unique_id, json.dumps(paths), cleanup_at))
+        except sqlite3.Error as e:
+            print(f"Error persisting cleanup for {unique_id}: {e}")
+        with self.wakeup:
+            self.registry[unique_id] = {'paths': paths, 'cleanup_at': cleanup_at}
+            heapq.heappush(self.heap, (cleanup_at, unique_id))
+            self.wakeup.notify()
+    
+    def _run(self):
+        while True:
+            with self.wakeup:
+                while True:
+                    if not self.heap:
+                        self.wakeup.wait()
+                        continue
+                    cleanup_at, unique_id = self.heap[0]
+                    delay = cleanup_at - time.time()
+                    if delay > 0:
+                        self.wakeup.wait(delay)
+                        continue
+                    heapq.heappop(self.heap)
+                    entry = self.registry.get(unique_id)
+                    # Skip heap entries superseded by a later registration
+                    if entry is not None and entry['cleanup_at'] == cleanup_at:
+                        del self.registry[unique_id]
+                        break
+            self.cleanup_files(unique_id, entry['paths'])
+    
+    def cleanup_files(self, unique_id, paths):
+        try:
+            # Remove files if they exist
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            with closing(self._connect()) as conn, conn:
+                conn.execute('DELETE FROM pending_files WHERE unique_id = ?', (unique_id,))
+            result_cache.discard(unique_id)
+            pipeline_metrics.increment('file_cleanups')
+            print(f"Cleaned up files for {unique_id}")
+        except Exception as e:
+            print(f"Error cleaning up files for {unique_id}: {e}")
+    
+    def sweep_orphans(self):
+        """Delete leftover files older than the cleanup window that nothing is tracking"""
+        with self.lock:
+            tracked = {path for entry in self.registry.values() for path in entry['paths']}
+        cutoff = time.time() - FILE_CLEANUP_MINUTES * 60
+        for folder in (UPLOAD_FOLDER, DOWNLOAD_FOLDER):
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                try:
+                    if path not in tracked and os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        print(f"Removed orphaned file {path}")
+                except OSError as e:
+                    print(f"Error removing orphaned file {path}: {e}")
+    
+    def stats(self):
+        with self.lock:
+            paths = [path for entry in self.registry.values() for path in entry['paths']]
+        return {
+            'pending_expirations': len(self.registry),
+            'bytes_on_disk': sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        }
 
-def send_whatsapp_notification(phone_number, summary, unique_id):
-    """Send WhatsApp notification using Twilio API"""
-    try:
+file_reaper = FileReaper(FILE_REGISTRY_DB)
+
+class TokenBucket:
+    """Simple per-provider rate limiter"""
+    
+    def __init__(self, rate_per_second, burst):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class LiveTransport:
+    """Delivers through Twilio and SendGrid, reusing one client per provider"""
+    
+    def __init__(self):
+        self.twilio_client = None
+        self.sendgrid_client = None
+        self.lock = threading.Lock()
+    
+    def send(self, channel, payload):
+        if channel == 'whatsapp':
+            return self.send_whatsapp(payload)
+        if channel == 'email':
+            return self.send_email(payload)
+        raise ValueError(f"Unknown notification channel: {channel}")
+    
+    def send_whatsapp(self, payload):
         # Get Twilio credentials from environment
         account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
         auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
@@ -540,12 +2660,209 @@ def send_whatsapp_notification(phone_number, summary, unique_id):
         
         if not all([account_sid, auth_token, twilio_phone]) or twilio_phone == "DISABLED":
             print("Twilio WhatsApp disabled or credentials incomplete, simulating message")
-            print(f"Would send WhatsApp to {phone_number}: Your BillKaro statement report is ready!")
-            return True
+            print(f"Would send WhatsApp to {payload['to']}: Your BillKaro statement report is ready!")
+            return
         
-        # Initialize Twilio client
-        client = Client(account_sid, auth_token)
+        with self.lock:
+            if self.twilio_client is None:
+                self.twilio_client = Client(account_sid, auth_token)
+        
+        # Send WhatsApp message
+        message = self.twilio_client.messages.create(
+            body=payload['body'],
+            from_=f"whatsapp:{twilio_phone}",
+            to=payload['to']
+        )
+        print(f"WhatsApp message sent successfully. SID: {message.sid}")
+    
+    def send_email(self, payload):
+        # Get SendGrid API key from environment
+        sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
+        excel_path = payload.get('attachment_path')
+        
+        if not sendgrid_api_key:
+            print("SendGrid API key not configured, simulating email")
+            print(f"Would send email to {payload['to']} with attachment: {excel_path}")
+            print("Email simulation: BillKaro Statement Report would be sent with Excel attachment")
+            return
+        
+        with self.lock:
+            if self.sendgrid_client is None:
+                self.sendgrid_client = SendGridAPIClient(sendgrid_api_key)
+        
+        # Create the email
+        message = Mail(
+            from_email='noreply@billkaro.com',
+            to_emails=payload['to'],
+            subject=payload['subject'],
+            html_content=payload['html'],
+            plain_text_content=payload['text']
+        )
+        
+        # Add Excel file attachment
+        if excel_path and os.path.exists(excel_path):
+            encoded_file = encode_attachment(excel_path)
+            
+            attached_file = Attachment(
+                FileContent(encoded_file),
+                FileName(os.path.basename(excel_path)),
+                FileType('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+                Disposition('attachment')
+            )
+            message.attachment = attached_file
         
+        # Send the email
+        response = self.sendgrid_client.send(message)
+        if response.status_code >= 400:
+            raise RuntimeError(f"SendGrid returned status {response.status_code}")
+        print(f"Email sent successfully. Status code: {response.status_code}")
+
+def encode_attachment(path):
+    """Base64-encode a file straight from an mmap, without reading it into memory first
+    
+    SendGrid takes the attachment as one string, so it is encoded in a single pass;
+    attachments are capped at EMAIL_ATTACHMENT_MAX_BYTES.
+    """
+    # An empty file can't be mapped
+    if os.path.getsize(path) == 0:
+        return ''
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return base64.b64encode(mapped).decode('ascii')
+
+class FileTransport:
+    """Loopback transport that appends each notification to a JSON-lines file"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+    
+    def send(self, channel, payload):
+        record = json.dumps({'channel': channel, 'payload': payload, 'sent_at': time.time()})
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(record + '\n')
+
+def build_notification_transport():
+    if NOTIFICATION_TRANSPORT == 'file':
+        return FileTransport(NOTIFICATION_OUTBOX_FILE)
+    return LiveTransport()
+
+class NotificationDispatcher:
+    """Delivers WhatsApp and email notifications off the request path
+    
+    Messages are written to a SQLite outbox, so anything still pending survives
+    a restart and can be enqueued from pool worker processes. Worker threads
+    claim due messages with a lease, send them through the transport under a
+    per-provider rate limit, and retry failures with exponential backoff.
+    """
+    
+    def __init__(self, db_path, transport, workers, rate_limits):
+        self.db_path = db_path
+        self.transport = transport
+        self.workers = workers
+        self.limiters = {channel: TokenBucket(rate, burst) for channel, (rate, burst) in rate_limits.items()}
+        self.wakeup = threading.Event()
+        self.threads = []
+        self.pid = None
+        self.lock = threading.Lock()
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('CREATE TABLE IF NOT EXISTS outbox ('
+                     'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, payload TEXT NOT NULL, '
+                     'attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, '
+                     'claimed_until REAL NOT NULL DEFAULT 0, last_error TEXT)')
+        return conn
+    
+    def enqueue(self, channel, payload):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('INSERT INTO outbox (channel, payload, next_attempt_at) VALUES (?, ?, ?)',
+                         (channel, json.dumps(payload), time.time()))
+        self.wakeup.set()
+    
+    def ensure_started(self):
+        """Start the delivery threads in this process"""
+        with self.lock:
+            # A forked child inherits the object but not the threads
+            if self.threads and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.threads = [threading.Thread(target=self._run, name=f'notifier-{i}', daemon=True)
+                            for i in range(self.workers)]
+            for thread in self.threads:
+                thread.start()
+    
+    def is_running(self):
+        return (self.pid == os.getpid() and bool(self.threads)
+                and all(thread.is_alive() for thread in self.threads))
+    
+    def _claim(self):
+        """Lease the next due message so no other thread or process sends it"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute('SELECT id, channel, payload, attempts FROM outbox '
+                               'WHERE next_attempt_at <= ? AND claimed_until <= ? '
+                               'ORDER BY next_attempt_at LIMIT 1', (now, now)).fetchone()
+            if row is None:
+                return None
+            claimed = conn.execute('UPDATE outbox SET claimed_until = ? WHERE id = ? AND claimed_until <= ?',
+                                   (now + NOTIFICATION_LEASE_SECONDS, row[0], now)).rowcount
+            return row if claimed else None
+    
+    def _run(self):
+        while True:
+            try:
+                row = self._claim()
+                if row is not None:
+                    self._deliver(*row)
+                    continue
+            except sqlite3.Error as e:
+                # A locked or failing outbox: back off and try again. A message
+                # claimed before the error is retried once its lease runs out.
+                print(f"Notification outbox error: {e}")
+                pipeline_metrics.increment('notification_outbox_errors')
+            self.wakeup.wait(NOTIFICATION_POLL_SECONDS)
+            self.wakeup.clear()
+    
+    def _deliver(self, message_id, channel, payload, attempts):
+        limiter = self.limiters.get(channel)
+        if limiter:
+            limiter.acquire()
+        try:
+            with pipeline_metrics.timed(f'notify_{channel}'):
+                self.transport.send(channel, json.loads(payload))
+        except Exception as e:
+            pipeline_metrics.increment(f'{channel}_notification_failures')
+            attempts += 1
+            with closing(self._connect()) as conn, conn:
+                if attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                    print(f"Giving up on {channel} notification {message_id} after {attempts} attempts: {e}")
+                    conn.execute('DELETE FROM outbox WHERE id = ?', (message_id,))
+                else:
+                    delay = min(NOTIFICATION_BACKOFF_SECONDS * 2 ** (attempts - 1), NOTIFICATION_MAX_BACKOFF_SECONDS)
+                    print(f"{channel} notification {message_id} failed ({e}), retrying in {delay:.0f}s")
+                    conn.execute('UPDATE outbox SET attempts = ?, next_attempt_at = ?, claimed_until = 0, '
+                                 'last_error = ? WHERE id = ?', (attempts, time.time() + delay, str(e), message_id))
+            return
+        pipeline_metrics.increment(f'{channel}_notifications_sent')
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM outbox WHERE id = ?', (message_id,))
+    
+    def stats(self):
+        with closing(self._connect()) as conn:
+            pending, retrying = conn.execute('SELECT COUNT(*), COALESCE(SUM(attempts > 0), 0) FROM outbox').fetchone()
+        return {'pending': pending, 'retrying': retrying}
+
+notification_dispatcher = NotificationDispatcher(
+    NOTIFICATION_DB,
+    build_notification_transport(),
+    NOTIFICATION_WORKERS,
+    NOTIFICATION_RATE_LIMITS
+)
+
+def send_whatsapp_notification(phone_number, summary, unique_id):
+    """Queue a WhatsApp notification for delivery through Twilio"""
+    try:
         # Format phone number for WhatsApp (must include country code)
         if not phone_number.startswith('whatsapp:+'):
             if phone_number.startswith('+'):
@@ -572,36 +2889,28 @@ File ID: {unique_id}
 
 Thank you for using BillKaro! 🙏"""
         
-        # Send WhatsApp message
-        message = client.messages.create(
-            body=message_body,
-            from_=f"whatsapp:{twilio_phone}",
-            to=whatsapp_number
-        )
-        
-        print(f"WhatsApp message sent successfully. SID: {message.sid}")
+        notification_dispatcher.enqueue('whatsapp', {'to': whatsapp_number, 'body': message_body})
         return True
         
     except Exception as e:
-        print(f"WhatsApp sending error: {e}")
-        # Fallback to simulation if API fails
-        print(f"Fallback: Simulating WhatsApp message to {phone_number}")
-        return True
+        print(f"Error queueing WhatsApp notification: {e}")
+        return False
 
 def send_email_report(email_address, df, summary, excel_path):
-    """Send email report with Excel attachment using SendGrid"""
+    """Queue an email report with Excel attachment for delivery through SendGrid"""
     try:
-        # Get SendGrid API key from environment
-        sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
-        
-        if not sendgrid_api_key:
-            print("SendGrid API key not configured, simulating email")
-            print(f"Would send email to {email_address} with attachment: {excel_path}")
-            print("Email simulation: BillKaro Statement Report would be sent with Excel attachment")
-            return True
-        
-        # Initialize SendGrid client
-        sg = SendGridAPIClient(sendgrid_api_key)
+        # Large workbooks are linked rather than attached
+        attach = os.path.exists(excel_path) and os.path.getsize(excel_path) <= EMAIL_ATTACHMENT_MAX_BYTES
+        if attach:
+            delivery_html = "Your processed bank statement is attached as an Excel file."
+            delivery_text = delivery_html
+        else:
+            download_url = f"{PUBLIC_BASE_URL}/download/excel/{os.path.basename(excel_path)}"
+            delivery_html = (f'Your processed bank statement is too large to attach. '
+                             f'<a href="{download_url}">Download the Excel file</a> '
+                             f'within {FILE_CLEANUP_MINUTES} minutes.')
+            delivery_text = (f"Your processed bank statement is too large to attach. Download the Excel file "
+                             f"within {FILE_CLEANUP_MINUTES} minutes: {download_url}")
         
         # Create email content
         subject = "Your BillKaro Statement Report"
@@ -642,8 +2951,8 @@ def send_email_report(email_address, df, summary, excel_path):
                 </div>
                 
                 <div style="background: #e3f2fd; padding: 15px; border-radius: 8px; margin-bottom: 20px;">
-                    <h3 style="color: #1976d2; margin-top: 0;">Attached Files</h3>
-                    <p>Your processed bank statement is attached as an Excel file. This includes:</p>
+                    <h3 style="color: #1976d2; margin-top: 0;">{'Attached Files' if attach else 'Your Files'}</h3>
+                    <p>{delivery_html} This includes:</p>
                     <ul>
                         <li>All transactions with smart categorization</li>
                         <li>Monthly spending breakdown by category</li>
@@ -674,72 +2983,258 @@ def send_email_report(email_address, df, summary, excel_path):
         - Net Balance Change: ₹{summary.get('balance_change', 0):,.2f}
         - Top Expense Category: {summary.get('top_category', 'N/A')}
         
-        Your processed bank statement is attached as an Excel file.
+        {delivery_text}
         
         Thank you for using BillKaro!
         Digital India ka Bill Assistant
         """
         
-        # Create the email
-        message = Mail(
-            from_email='noreply@billkaro.com',
-            to_emails=email_address,
-            subject=subject,
-            html_content=html_content,
-            plain_text_content=text_content
-        )
-        
-        # Add Excel file attachment
-        if os.path.exists(excel_path):
-            with open(excel_path, 'rb') as f:
-                file_data = f.read()
-                encoded_file = base64.b64encode(file_data).decode()
-            
-            attached_file = Attachment(
-                FileContent(encoded_file),
-                FileName(os.path.basename(excel_path)),
-                FileType('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
-                Disposition('attachment')
-            )
-            message.attachment = attached_file
-        
-        # Send the email
-        response = sg.send(message)
-        print(f"Email sent successfully. Status code: {response.status_code}")
+        notification_dispatcher.enqueue('email', {
+            'to': email_address,
+            'subject': subject,
+            'html': html_content,
+            'text': text_content,
+            'attachment_path': excel_path if attach else None
+        })
         return True
         
     except Exception as e:
-        print(f"Email sending error: {e}")
-        # Fallback to simulation if API fails
-        print(f"Fallback: Simulating email to {email_address} with attachment: {excel_path}")
-        return True
+        print(f"Error queueing email report: {e}")
+        return False
+
+def month_key(date):
+    """'YYYY-MM' for an ISO date string, 'Unknown' when it can't be read"""
+    try:
+        return datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m')
+    except (TypeError, ValueError):
+        return 'Unknown'
+
+def month_keys(dates):
+    """'YYYY-MM' for each date of a datetime64 array, 'Unknown' where it is missing"""
+    month_values = dates.astype('datetime64[M]')
+    months = np.datetime_as_string(month_values, unit='M').astype(object)
+    months[np.isnat(month_values)] = 'Unknown'
+    return months
+
+class SummaryAccumulator:
+    """Running statement summary that can be updated as rows arrive and merged
+    
+    Rows can be folded in one at a time or a block at a time, and accumulators
+    over consecutive stretches of transactions, such as the statements of a
+    batch, are merged in order. Either way the totals match a single pass.
+    Amounts are summed as integer paise and only converted to rupees in to_summary().
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.total_debits = 0
+        self.total_credits = 0
+        self.category_debits = {}
+        self.monthly = {}
+        # Balance after the first and last transaction seen
+        self.opening = None
+        self.closing = None
+    
+    def add(self, transaction):
+        """Fold in one transaction dict with an ISO date and rupee amounts; returns its month key"""
+        debit = to_paise(transaction['Debit'])
+        credit = to_paise(transaction['Credit'])
+        month = month_key(transaction['Date'])
+        
+        self.count += 1
+        self.total_debits += debit
+        self.total_credits += credit
+        category = transaction['Category']
+        self.category_debits[category] = self.category_debits.get(category, 0) + debit
+        totals = self.monthly.setdefault(month, [0, 0])
+        totals[0] += debit
+        totals[1] += credit
+        
+        balance = to_paise(transaction['Balance'])
+        if self.opening is None:
+            self.opening = balance
+        self.closing = balance
+        return month
+    
+    def add_columns(self, dates, debits, credits, balances, category_codes, category_names):
+        """Fold in a block of rows given as arrays; returns their month keys
+        
+        dates are datetime64, amounts int64 paise and categories integer codes into
+        category_names (-1 for none).
+        """
+        if len(debits) == 0:
+            return np.array([], dtype=object)
+        
+        self.count += len(debits)
+        self.total_debits += int(debits.sum())
+        self.total_credits += int(credits.sum())
+        
+        known = category_codes >= 0
+        category_totals = np.zeros(len(category_names), dtype=np.int64)
+        np.add.at(category_totals, category_codes[known], debits[known])
+        for category, debit in zip(category_names, category_totals.tolist()):
+            self.category_debits[category] = self.category_debits.get(category, 0) + debit
+        
+        months = month_keys(dates)
+        month_names, month_index = np.unique(months, return_inverse=True)
+        month_debits = np.zeros(len(month_names), dtype=np.int64)
+        month_credits = np.zeros(len(month_names), dtype=np.int64)
+        np.add.at(month_debits, month_index, debits)
+        np.add.at(month_credits, month_index, credits)
+        for month, debit, credit in zip(month_names, month_debits.tolist(), month_credits.tolist()):
+            totals = self.monthly.setdefault(month, [0, 0])
+            totals[0] += debit
+            totals[1] += credit
+        
+        if self.opening is None:
+            self.opening = int(balances[0])
+        self.closing = int(balances[-1])
+        return months
+    
+    def add_buffer(self, buffer):
+        """Fold in every row of a TransactionBuffer; returns their month keys"""
+        columns = buffer.arrays()
+        return self.add_columns(columns['Date'], columns['Debit'], columns['Credit'], columns['Balance'],
+                                columns['Category'], buffer.category_names)
+    
+    def add_frame(self, df):
+        """Fold in a transactions DataFrame with rupee amounts; returns their month keys"""
+        def paise(column):
+            return np.round(df[column].fillna(0).to_numpy(dtype=float) * 100).astype(np.int64)
+        
+        categories = pd.Categorical(df['Category'])
+        return self.add_columns(pd.to_datetime(df['Date'], errors='coerce').to_numpy(dtype='datetime64[s]'),
+                                paise('Debit'), paise('Credit'), paise('Balance'),
+                                categories.codes, list(categories.categories))
+    
+    def merge(self, other):
+        """Fold in an accumulator covering the transactions that follow this one's"""
+        self.count += other.count
+        self.total_debits += other.total_debits
+        self.total_credits += other.total_credits
+        for category, debit in other.category_debits.items():
+            self.category_debits[category] = self.category_debits.get(category, 0) + debit
+        for month, (debit, credit) in other.monthly.items():
+            totals = self.monthly.setdefault(month, [0, 0])
+            totals[0] += debit
+            totals[1] += credit
+        
+        if self.opening is None:
+            self.opening = other.opening
+        if other.closing is not None:
+            self.closing = other.closing
+        return self
+    
+    def to_summary(self):
+        if self.count == 0:
+            return {}
+        return {
+            'total_transactions': self.count,
+            'total_debits': self.total_debits / 100,
+            'total_credits': self.total_credits / 100,
+            'net_amount': (self.total_credits - self.total_debits) / 100,
+            'category_expenses': {category: debit / 100 for category, debit in sorted(self.category_debits.items())
+                                  if debit > 0},
+            'monthly_summary': {month: {'Debit': debit / 100, 'Credit': credit / 100}
+                                for month, (debit, credit) in sorted(self.monthly.items())},
+            'opening_balance': self.opening / 100,
+            'closing_balance': self.closing / 100
+        }
 
 def generate_summary(df):
     """Generate financial summary from transactions"""
     if df.empty:
         return {}
     
-    # Category-wise expenses
-    category_summary = df.groupby('Category')['Debit'].sum().to_dict()
-    category_summary = {k: v for k, v in category_summary.items() if v > 0}
+    accumulator = SummaryAccumulator()
+    df['Month'] = accumulator.add_frame(df)
+    return accumulator.to_summary()
+
+def summary_sheet_rows(summary):
+    """Metric/Value rows for the Summary sheet"""
+    has_rows = summary.get('total_transactions', 0) > 0
+    return [
+        ['Total Transactions', summary.get('total_transactions', 0)],
+        ['Total Debits', f"₹{summary.get('total_debits', 0):,.2f}"],
+        ['Total Credits', f"₹{summary.get('total_credits', 0):,.2f}"],
+        ['Net Amount', f"₹{summary.get('net_amount', 0):,.2f}"],
+        ['Opening Balance', f"₹{summary['opening_balance']:,.2f}" if has_rows else "₹0"],
+        ['Closing Balance', f"₹{summary['closing_balance']:,.2f}" if has_rows else "₹0"]
+    ]
+
+def category_sheet_rows(summary):
+    """Category/Amount rows for the Categories sheet"""
+    return [
+        [category, f"₹{amount:,.2f}"]
+        for category, amount in summary.get('category_expenses', {}).items()
+    ]
+
+def write_excel_report(df, summary, excel_path):
+    """Write the Transactions, Summary and Categories sheets, streaming large statements"""
+    if pd.api.types.is_datetime64_any_dtype(df['Date']):
+        # Plain date cells, without a midnight time part
+        df = df.assign(Date=df['Date'].dt.date)
+    if len(df) >= XLSX_STREAMING_THRESHOLD:
+        write_excel_report_streaming(df, summary, excel_path)
+    else:
+        write_excel_report_in_memory(df, summary, excel_path)
+
+def write_excel_report_in_memory(df, summary, excel_path):
+    """Build the whole workbook through pandas before saving it"""
+    with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Transactions', index=False)
+        
+        # Add summary sheet
+        summary_df = pd.DataFrame(summary_sheet_rows(summary), columns=['Metric', 'Value'])
+        summary_df.to_excel(writer, sheet_name='Summary', index=False)
+        
+        # Add category-wise summary sheet
+        category_rows = category_sheet_rows(summary)
+        if category_rows:
+            category_df = pd.DataFrame(category_rows, columns=['Category', 'Amount Spent'])
+            category_df.to_excel(writer, sheet_name='Categories', index=False)
+
+def write_excel_report_streaming(df, summary, excel_path):
+    """Write rows straight to disk with a write-only openpyxl workbook"""
+    workbook = Workbook(write_only=True)
+    write_sheet_rows(workbook, 'Transactions', list(df.columns), df.itertuples(index=False, name=None))
+    write_sheet_rows(workbook, 'Summary', ['Metric', 'Value'], summary_sheet_rows(summary))
     
-    # Monthly summary (if data spans multiple months)
-    df['Month'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m')
-    monthly_summary = df.groupby('Month').agg({
-        'Debit': 'sum',
-        'Credit': 'sum'
-    }).to_dict('index')
+    category_rows = category_sheet_rows(summary)
+    if category_rows:
+        write_sheet_rows(workbook, 'Categories', ['Category', 'Amount Spent'], category_rows)
+    workbook.save(excel_path)
+
+def write_sheet_rows(workbook, title, header, rows):
+    sheet = workbook.create_sheet(title)
+    # Same header look as pandas' to_excel: bold, thin border, centered
+    header_cells = []
+    for name in header:
+        cell = WriteOnlyCell(sheet, value=str(name))
+        cell.font = XLSX_HEADER_FONT
+        cell.border = XLSX_HEADER_BORDER
+        cell.alignment = XLSX_HEADER_ALIGNMENT
+        header_cells.append(cell)
+    sheet.append(header_cells)
     
-    return {
-        'total_transactions': len(df),
-        'total_debits': float(df['Debit'].sum()),
-        'total_credits': float(df['Credit'].sum()),
-        'net_amount': float(df['Credit'].sum() - df['Debit'].sum()),
-        'category_expenses': category_summary,
-        'monthly_summary': monthly_summary,
-        'opening_balance': float(df['Balance'].iloc[0]) if len(df) > 0 else 0,
-        'closing_balance': float(df['Balance'].iloc[-1]) if len(df) > 0 else 0
-    }
+    for row in rows:
+        # NaN and NaT become empty cells, as pandas writes them
+        sheet.append([None if value is pd.NaT or (isinstance(value, float) and value != value) else value
+                      for value in row])
+
+def warm_up():
+    """Build the parser's lazily compiled tables now, e.g. before a preforking server forks"""
+    get_category_matcher()
+    # strptime loads its locale tables on first use
+    datetime.strptime('01/01/2000', '%d/%m/%Y')
+
+def start_background_threads():
+    """Resume persisted cleanups, sweep orphaned files and start notification delivery"""
+    file_reaper.ensure_started()
+    notification_dispatcher.ensure_started()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Development server; production runs under gunicorn (see gunicorn.conf.py)
+    start_background_threads()
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)),
+            debug=os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# Benchmark: end-to-end statement parsing throughput, peak memory and /upload latency
+#
+# Generates synthetic statements in each bank style (see synthetic_statements.py)
+# and, for every bank and page count, measures in a fresh process:
+#   - parse: statement_parser_for + parse_pdf_columnar -> pages/sec, transactions/sec
+#   - peak memory: growth of the process's peak RSS during the first parse
+#   - upload: POST /upload through Flask's test client, including the stored export
+# Every case also checks that the statement summary comes out the same folded a
+# page's worth of rows at a time, in one pass, and from the stored DataFrame, and
+# that a batch merge of the statement split in two puts every row back in date
+# order, with a row whose date couldn't be read last, and merges the halves'
+# summaries into the single-pass one.
+# Each case starts with an untimed warmup parse and upload, then times --repeats
+# runs of each: throughput comes from the fastest run and upload latency from the
+# median, and the spread between runs is recorded with them.
+#
+# Results are written as JSON. Pass a previous results file as --baseline to
+# flag cases that got slower or hungrier than allowed; the exit status is 1 when
+# any case regressed. Timing metrics may move by --tolerance plus the larger of
+# the two runs' measured spread, so noise on a busy machine is not reported as
+# a regression.
+#
+# The 1000-page cases take several minutes per bank.
+#
+# Usage: python benchmarks/bench_parser.py [--banks SBI HDFC] [--pages 1 10 100 1000]
+#            [--repeats 5] [--output results.json] [--baseline baseline.json] [--tolerance 0.15]
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app
+from synthetic_statements import BANK_STYLES, synthetic_statement
+
+# Metrics compared against the baseline: whether higher is better, and the
+# recorded spread that widens their tolerance (None for memory)
+COMPARED_METRICS = {
+    'pages_per_sec': (True, 'parse_spread'),
+    'transactions_per_sec': (True, 'parse_spread'),
+    'peak_memory_mib': (False, None),
+    'upload_seconds': (False, 'upload_spread'),
+}
+# Peak RSS moves by a few MiB between identical runs; smaller changes are ignored
+MEMORY_NOISE_MIB = 4
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def spread(samples):
+    """Relative gap between the slowest and fastest of several timings"""
+    return (max(samples) - min(samples)) / min(samples) if min(samples) > 0 else 0.0
+
+def time_parse(pdf_path):
+    parser = app.statement_parser_for(pdf_path)
+    start = time.perf_counter()
+    transactions = parser.parse_pdf_columnar(pdf_path)
+    return time.perf_counter() - start, parser, transactions
+
+def time_upload(client, pdf_path, name):
+    with open(pdf_path, 'rb') as f:
+        start = time.perf_counter()
+        response = client.post('/upload', data={'file': (f, name)})
+        seconds = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"/upload failed for {name}: {response.get_json()}")
+    return seconds
+
+def check_summary(buffer, blocks):
+    """Raise unless the summary folded in blocks, and from the DataFrame, matches a single pass"""
+    one_pass = app.SummaryAccumulator()
+    one_pass.add_buffer(buffer)
+    expected = one_pass.to_summary()
+
+    columns = buffer.arrays()
+    blockwise = app.SummaryAccumulator()
+    step = max(len(buffer) // blocks, 1)
+    for start in range(0, len(buffer), step):
+        rows = slice(start, start + step)
+        blockwise.add_columns(columns['Date'][rows], columns['Debit'][rows], columns['Credit'][rows],
+                              columns['Balance'][rows], columns['Category'][rows], buffer.category_names)
+
+    for name, summary in (('blockwise', blockwise.to_summary()),
+                          ('DataFrame', app.generate_summary(buffer.to_frame()))):
+        if summary != expected:
+            raise RuntimeError(f"{name} summary differs from a single pass: {summary} != {expected}")
+
+def statement_part(records):
+    """A batch statement as parse_statement_file returns it: records and their summary"""
+    accumulator = app.SummaryAccumulator()
+    accumulator.add_buffer(app.TransactionBuffer.from_records(records))
+    return records, accumulator
+
+def check_merge(buffer):
+    """Raise unless merging the statement's overlapping halves, given latest first, restores it"""
+    df = buffer.to_frame()
+    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+    records = df.to_dict('records')
+    half = len(records) // 2
+
+    one_pass = app.SummaryAccumulator()
+    one_pass.add_buffer(buffer)
+    _, _, merged_summary = app.merge_statements([statement_part(records[half:]),
+                                                 statement_part(records[:half + 1])])
+    if merged_summary.to_summary() != one_pass.to_summary():
+        raise RuntimeError(f"merged summary differs from a single pass: "
+                           f"{merged_summary.to_summary()} != {one_pass.to_summary()}")
+
+    garbled = dict(records[0], Date='ocr-garbled', Description='row with an unreadable date')
+    merged, duplicates, _ = app.merge_statements([statement_part(records[half:]),
+                                                  statement_part(records[:half + 1] + [garbled])])
+    if duplicates != 1 or len(merged) != len(records) + 1:
+        raise RuntimeError(f"merge kept {len(merged)} of {len(records) + 1} rows, {duplicates} duplicates")
+    if merged[-1] is not garbled:
+        raise RuntimeError(f"row with an unreadable date was not merged last: {merged[-1]}")
+    dates = [transaction['Date'] for transaction in merged[:-1]]
+    if dates != sorted(dates):
+        raise RuntimeError("merged rows are not in date order")
+
+def run_case(bank, pages, workdir, parse_workers, repeats):
+    """Measure one bank/page-count case; runs in its own process so peak RSS is per case"""
+    # Uploads, exports and the cleanup registry all go to the scratch directory
+    os.chdir(workdir)
+    app.UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+    app.DOWNLOAD_FOLDER = os.path.join(workdir, 'downloads')
+    os.makedirs(app.UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(app.DOWNLOAD_FOLDER, exist_ok=True)
+    app.PARSE_WORKERS = parse_workers
+    app.result_cache.max_entries = 0
+
+    pdf_path = os.path.join(workdir, f"{bank}_{pages}.pdf")
+    with open(pdf_path, 'wb') as f:
+        f.write(synthetic_statement(bank, pages))
+
+    # The first parse doubles as the warmup; it is the one that sets peak RSS
+    rss_before = peak_rss_mib()
+    _, parser, transactions = time_parse(pdf_path)
+    peak_memory = peak_rss_mib() - rss_before
+    check_summary(transactions, pages)
+    check_merge(transactions)
+    parse_times = [time_parse(pdf_path)[0] for _ in range(repeats)]
+    parse_seconds = min(parse_times)
+
+    client = app.app.test_client()
+    name = f"{bank}_{pages}.pdf"
+    time_upload(client, pdf_path, name)
+    upload_times = [time_upload(client, pdf_path, name) for _ in range(repeats)]
+
+    for pool in app.page_pools.values():
+        pool.shutdown()
+    return {
+        'bank': bank,
+        'pages': pages,
+        'detected_bank': parser.bank_type,
+        'transactions': len(transactions),
+        'repeats': repeats,
+        'parse_seconds': round(parse_seconds, 4),
+        'parse_spread': round(spread(parse_times), 3),
+        'pages_per_sec': round(pages / parse_seconds, 2),
+        'transactions_per_sec': round(len(transactions) / parse_seconds, 1),
+        'peak_memory_mib': round(peak_memory, 1),
+        'upload_seconds': round(statistics.median(upload_times), 4),
+        'upload_spread': round(spread(upload_times), 3),
+    }
+
+def compare(results, baseline, tolerance):
+    """Return a description of every metric that regressed beyond tolerance"""
+    previous = {(case['bank'], case['pages']): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        before = previous.get((case['bank'], case['pages']))
+        if before is None:
+            continue
+        for metric, (higher_is_better, spread_metric) in COMPARED_METRICS.items():
+            old, new = before.get(metric), case.get(metric)
+            if not old or new is None:
+                continue
+            if spread_metric is None and abs(new - old) < MEMORY_NOISE_MIB:
+                continue
+            allowed = tolerance
+            if spread_metric is not None:
+                allowed += max(before.get(spread_metric, 0), case.get(spread_metric, 0))
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > allowed:
+                regressions.append(f"{case['bank']:<6} {case['pages']:>5} pages  {metric}: "
+                                   f"{old} -> {new} ({change:+.0%}, allowed {allowed:.0%})")
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--banks', nargs='+', choices=sorted(BANK_STYLES), default=list(BANK_STYLES))
+    arg_parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000])
+    arg_parser.add_argument('--parse-workers', type=int, default=1)
+    arg_parser.add_argument('--repeats', type=int, default=5)
+    arg_parser.add_argument('--output', default='bench_parser_results.json')
+    arg_parser.add_argument('--baseline')
+    arg_parser.add_argument('--tolerance', type=float, default=0.15)
+    args = arg_parser.parse_args()
+
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'parse_workers': args.parse_workers,
+        'repeats': args.repeats,
+        'cases': []
+    }
+
+    print(f"{'bank':<6} {'pages':>5} {'txns':>7} {'pages/s':>9} {'txns/s':>10} {'peak MiB':>9} {'upload s':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for bank in args.banks:
+            for pages in args.pages:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    case = executor.submit(run_case, bank, pages, workdir, args.parse_workers,
+                                           args.repeats).result()
+                results['cases'].append(case)
+                print(f"{bank:<6} {pages:>5} {case['transactions']:>7} {case['pages_per_sec']:>9.1f} "
+                      f"{case['transactions_per_sec']:>10.0f} {case['peak_memory_mib']:>9.1f} "
+                      f"{case['upload_seconds']:>9.3f}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%} plus measured spread:")
+            print('\n'.join(regressions))
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} plus measured spread against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# Benchmark: XLSX export wall time and peak memory
+#
+# Compares the in-memory pandas/openpyxl workbook against the write-only
+# streaming workbook used for large statements, at several row counts.
+# Each writer runs twice: untraced for wall time, then under tracemalloc for
+# peak memory (Python allocations only), since tracing slows allocation-heavy
+# code several times over and would skew the timing comparison.
+#
+# Usage: python benchmarks/bench_xlsx_export.py [--rows 1000 10000 100000]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app import generate_summary, write_excel_report_in_memory, write_excel_report_streaming
+
+def synthetic_transactions(count, seed=42):
+    rng = random.Random(seed)
+    categories = ['Groceries', 'Utilities', 'Food & Dining', 'Shopping', 'Banking', 'Other']
+    balance = 500000.0
+    rows = []
+    for i in range(count):
+        amount = round(rng.uniform(10, 50000), 2)
+        is_debit = rng.random() < 0.7
+        balance += -amount if is_debit else amount
+        rows.append({
+            'Date': f"2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
+            'Description': f"UPI/{rng.randint(100000, 999999)}/Merchant {i % 500}",
+            'Debit': amount if is_debit else 0,
+            'Credit': 0 if is_debit else amount,
+            'Balance': round(balance, 2),
+            'Category': rng.choice(categories)
+        })
+    return pd.DataFrame(rows)
+
+def measure(writer, df, summary, path):
+    start = time.perf_counter()
+    writer(df, summary, path)
+    elapsed = time.perf_counter() - start
+    
+    tracemalloc.start()
+    writer(df, summary, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = arg_parser.parse_args()
+    
+    print(f"{'rows':>8}  {'writer':<10} {'seconds':>9} {'peak MiB':>9} {'file KiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.rows:
+            df = synthetic_transactions(count)
+            summary = generate_summary(df)
+            for label, writer in [('in-memory', write_excel_report_in_memory),
+                                  ('streaming', write_excel_report_streaming)]:
+                path = os.path.join(tmp, f"{label}_{count}.xlsx")
+                elapsed, peak = measure(writer, df, summary, path)
+                print(f"{count:>8}  {label:<10} {elapsed:>9.2f} {peak / 2**20:>9.1f} "
+                      f"{os.path.getsize(path) / 1024:>9.0f}")
+
+if __name__ == '__main__':
+    main()
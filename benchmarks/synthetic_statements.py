@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Synthetic bank statement PDFs for benchmarks
+#
+# Writes text-only PDFs laid out like the SBI, ICICI, HDFC, KOTAK and AXIS
+# statements BankStatementParser knows about: bank header on the first page,
+# a column header on every page and one transaction per line. With
+# --layout text each row is a single run of text; with --layout table every
+# cell sits at its column's position, amounts right-aligned, as in real
+# statement tables. The PDF writer has no dependencies and output is
+# deterministic for a given seed.
+#
+# Usage: python benchmarks/synthetic_statements.py --bank HDFC --pages 10 [--layout table] -o hdfc.pdf
+
+import argparse
+import random
+from datetime import date, timedelta
+
+ROWS_PER_PAGE = 40
+FONT_SIZE = 9
+LINE_HEIGHT = 11
+
+# Helvetica advance widths (1/1000 em) for right-aligning cells; other glyphs use the default
+HELVETICA_WIDTHS = dict.fromkeys('0123456789', 556)
+HELVETICA_WIDTHS.update({' ': 278, ',': 278, '.': 278, '/': 278, '-': 333, 'r': 333, 't': 278, 'l': 222,
+                         'i': 222, 'C': 722, 'D': 722, 'B': 667, 'A': 667, 'W': 944})
+HELVETICA_DEFAULT_WIDTH = 556
+
+DESCRIPTIONS = [
+    ('ATM Withdrawal Cash', True),
+    ('UPI/Swiggy Food Order payment', True),
+    ('Amazon Purchase Electronics', True),
+    ('Electricity Bill Payment', True),
+    ('BigBasket Groceries purchase', True),
+    ('Uber Ride payment', True),
+    ('Salary Credit ACME Pvt Ltd', False),
+    ('NEFT Transfer from Rahul', False),
+    ('Interest Credit', False),
+]
+
+def indian_grouping(amount):
+    """1234567.8 -> '12,34,567.80'"""
+    whole, fraction = f"{amount:.2f}".split('.')
+    head, tail = whole[:-3], whole[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ','.join(groups + [tail]) + '.' + fraction
+
+def sbi_row(day, description, amount, is_debit, balance):
+    debit, credit = (amount, 0) if is_debit else (0, amount)
+    return [f"{day:%d/%m/%Y}", description, f"{debit:,.2f}", f"{credit:,.2f}", f"{balance:,.2f}"]
+
+def icici_row(day, description, amount, is_debit, balance):
+    return [f"{day:%d-%m-%Y}", description, f"{amount:,.2f} {'Dr' if is_debit else 'Cr'}", f"{balance:,.2f} Cr"]
+
+def hdfc_row(day, description, amount, is_debit, balance):
+    withdrawal, deposit = (f"{amount:,.2f}", '') if is_debit else ('', f"{amount:,.2f}")
+    return [f"{day:%d/%m/%y}", description, withdrawal, deposit, f"{balance:,.2f}"]
+
+def kotak_row(day, description, amount, is_debit, balance):
+    return [f"{day:%d-%m-%Y}", description, indian_grouping(amount), indian_grouping(balance)]
+
+def axis_row(day, description, amount, is_debit, balance):
+    return [f"{day:%d-%m-%Y}", description, f"{'-' if is_debit else ''}{amount:,.2f}", f"{balance:,.2f}"]
+
+# columns: (header, x, align) - x is the left edge of left-aligned and the right
+# edge of right-aligned columns in table layout
+BANK_STYLES = {
+    'SBI': {
+        'header': ['STATE BANK OF INDIA', 'Account Statement'],
+        'columns': [('Txn Date', 40, 'left'), ('Description', 95, 'left'), ('Debit', 390, 'right'),
+                    ('Credit', 470, 'right'), ('Balance', 555, 'right')],
+        'row': sbi_row
+    },
+    'ICICI': {
+        'header': ['ICICI Bank Limited', 'Detailed Statement'],
+        'columns': [('Value Date', 40, 'left'), ('Transaction Remarks', 95, 'left'), ('Amount', 440, 'right'),
+                    ('Balance', 555, 'right')],
+        'row': icici_row
+    },
+    'HDFC': {
+        'header': ['HDFC BANK LTD', 'Statement of Account'],
+        'columns': [('Date', 40, 'left'), ('Narration', 90, 'left'), ('Withdrawal Amt.', 390, 'right'),
+                    ('Deposit Amt.', 470, 'right'), ('Closing Balance', 555, 'right')],
+        'row': hdfc_row
+    },
+    'KOTAK': {
+        'header': ['Kotak Mahindra Bank', 'Account Statement'],
+        'columns': [('Date', 40, 'left'), ('Narration', 95, 'left'), ('Amount', 440, 'right'),
+                    ('Balance', 555, 'right')],
+        'row': kotak_row
+    },
+    'AXIS': {
+        'header': ['AXIS BANK', 'Statement of Account'],
+        'columns': [('Tran Date', 40, 'left'), ('Particulars', 95, 'left'), ('Amount', 440, 'right'),
+                    ('Balance', 555, 'right')],
+        'row': axis_row
+    },
+}
+
+def text_width(text):
+    return sum(HELVETICA_WIDTHS.get(char, HELVETICA_DEFAULT_WIDTH) for char in text) * FONT_SIZE / 1000
+
+def layout_cells(style, cells, layout):
+    """One page line: cells joined by two spaces, or positioned (x, text) cells for a table"""
+    if layout == 'text':
+        return '  '.join(cell for cell in cells if cell)
+    return [(x if align == 'left' else x - text_width(cell), cell)
+            for (_, x, align), cell in zip(style['columns'], cells) if cell]
+
+def statement_pages(bank, page_count, rows_per_page=ROWS_PER_PAGE, seed=42, layout='text'):
+    """Lines for each page of a synthetic statement, as strings or positioned cells"""
+    style = BANK_STYLES[bank]
+    rng = random.Random(seed)
+    balance = 250000.0
+    day = date(2024, 1, 1)
+    pages = []
+    for page_number in range(page_count):
+        lines = list(style['header']) if page_number == 0 else []
+        lines.append(layout_cells(style, [header for header, _, _ in style['columns']], layout))
+        for _ in range(rows_per_page):
+            description, is_debit = rng.choice(DESCRIPTIONS)
+            amount = round(rng.uniform(10, 5000), 2)
+            # Keep the balance positive so every style can print it unsigned
+            if is_debit and amount > balance:
+                is_debit = False
+            balance = round(balance - amount if is_debit else balance + amount, 2)
+            lines.append(layout_cells(style, style['row'](day, description, amount, is_debit, balance), layout))
+            day += timedelta(days=rng.random() < 0.3)
+        lines.append(f"Page {page_number + 1} of {page_count}")
+        pages.append(lines)
+    return pages
+
+def make_pdf(pages):
+    """Minimal PDF 1.4 document in Helvetica
+    
+    Each page is a list of lines; a line is a string drawn at the left margin or a
+    list of (x, text) cells.
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(None)
+    page_ids = []
+    for lines in pages:
+        parts = []
+        for number, line in enumerate(lines):
+            y = 800 - number * LINE_HEIGHT
+            for x, text in ([(40, line)] if isinstance(line, str) else line):
+                escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+                parts.append(f"BT /F1 {FONT_SIZE} Tf {x:.2f} {y} Td ({escaped}) Tj ET".encode('latin-1'))
+        stream = b"\n".join(parts)
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content, font)))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+def synthetic_statement(bank, page_count, rows_per_page=ROWS_PER_PAGE, seed=42, layout='text'):
+    """PDF bytes of a synthetic statement in the given bank's style"""
+    return make_pdf(statement_pages(bank, page_count, rows_per_page, seed, layout))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--bank', choices=sorted(BANK_STYLES), default='SBI')
+    arg_parser.add_argument('--pages', type=int, default=1)
+    arg_parser.add_argument('--rows-per-page', type=int, default=ROWS_PER_PAGE)
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--layout', choices=['text', 'table'], default='text')
+    arg_parser.add_argument('-o', '--output', required=True)
+    args = arg_parser.parse_args()
+
+    with open(args.output, 'wb') as f:
+        f.write(synthetic_statement(args.bank, args.pages, args.rows_per_page, args.seed, args.layout))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# Gunicorn settings for BillKaro
+#
+# Usage: gunicorn -c gunicorn.conf.py wsgi:app
+# Readiness probe: GET /ready
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Import the app (pandas, pdfplumber, the compiled parser tables) once in the
+# master; workers are forked from it and share those pages copy-on-write, and a
+# recycled worker is back up without re-importing anything
+preload_app = True
+
+# Async jobs, batches and the result cache are held in each worker's memory, so
+# by default one worker serves requests on threads while parsing runs in its
+# process pools. Only raise WEB_CONCURRENCY behind session-sticky routing.
+#
+# That single worker's threads share one interpreter lock: request handling
+# outside the pools (small statements below PARALLEL_PAGE_THRESHOLD, CSV/Excel
+# exports, summaries) tops out at about one core whatever the machine size.
+# Large and async statements still use every core through PARSE_WORKERS and
+# ASYNC_WORKERS; when the small-upload path is the bottleneck, run more
+# single-worker instances behind sticky routing rather than more threads.
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# The web worker holds job, batch and result-cache state in memory, so it is not
+# recycled by default: parsing memory is capped instead by replacing the parse
+# pools' processes every POOL_MAX_TASKS_PER_WORKER tasks (see app.py). A nonzero
+# GUNICORN_MAX_REQUESTS restarts the worker after that many requests, status
+# polls and probes included, losing the jobs it holds; the jitter keeps several
+# workers from restarting together.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Large statements take a while to parse synchronously
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Worker heartbeats in RAM rather than on a possibly slow disk
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+
+def post_fork(server, worker):
+    # Threads don't survive fork, so each worker starts its own
+    from app import start_background_threads
+    start_background_threads()
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 # BillKaro Startup Script
+#
+# Serves the app under gunicorn (see gunicorn.conf.py). Dependencies are only
+# installed when asked: python start.py --install
 
 import subprocess
 import sys
@@ -15,28 +18,28 @@ def install_requirements():
     return True
 
 def start_application():
-    try:
-        os.system("python app.py")
-    except KeyboardInterrupt:
-        print("\nApplication stopped.")
+    # Replace this process so gunicorn receives signals (Ctrl+C, SIGTERM) directly
+    os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"])
 
 if __name__ == "__main__":
     print("BillKaro - Bank Statement Converter")
     print("=" * 40)
-    
-    # Check if requirements are installed
-    if not os.path.exists("requirements.txt"):
-        print("Requirements file not found!")
-        sys.exit(1)
-    
-    # Install dependencies
-    print("Installing dependencies...")
-    if install_requirements():
-        print("\nStarting BillKaro application...")
-        print("Open your browser and go to: http://localhost:5000")
-        print("Press Ctrl+C to stop the application")
-        print("-" * 40)
-        start_application()
-    else:
-        print("Failed to install dependencies. Please install manually:")
-        print("pip install -r requirements.txt")
+
+    # Run from the project directory so the config and app are found
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if "--install" in sys.argv[1:]:
+        if not os.path.exists("requirements.txt"):
+            print("Requirements file not found!")
+            sys.exit(1)
+        print("Installing dependencies...")
+        if not install_requirements():
+            print("Failed to install dependencies. Please install manually:")
+            print("pip install -r requirements.txt")
+            sys.exit(1)
+
+    print("\nStarting BillKaro application...")
+    print(f"Open your browser and go to: http://localhost:{os.environ.get('PORT', '5000')}")
+    print("Press Ctrl+C to stop the application")
+    print("-" * 40)
+    start_application()
@@ -0,0 +1,8 @@
+# WSGI entry point for production servers: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# With preload_app the server imports this once in its master process, so the
+# parser tables built here are shared with every forked worker.
+
+from app import app, warm_up
+
+warm_up()